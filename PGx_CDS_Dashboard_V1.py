@@ -35,542 +35,195 @@ For questions, suggestions, or collaboration, contact Barry Ohearn.
 """
 
 import streamlit as st
-from PyPDF2 import PdfReader
 import pandas as pd
-from fpdf import FPDF
+import io
+import os
+import hashlib
+import sys
 import tempfile
+from pathlib import Path
 
-# ----------------------- Brand/Generic Synonym Mapping -----------------------
-# Add new pairs as needed
-MED_SYNONYMS = {
-    # SSRIs / SNRIs
-    "lexapro": "escitalopram",
-    "celexa": "citalopram",
-    "paxil": "paroxetine",
-    "prozac": "fluoxetine",
-    "zoloft": "sertraline",
-    "effexor": "venlafaxine",
-    "cymbalta": "duloxetine",
-    # Antipsychotics
-    "abilify": "aripiprazole",
-    "risperdal": "risperidone",
-    "zyprexa": "olanzapine",
-    "seroquel": "quetiapine",
-    "geodon": "ziprasidone",
-    "haldol": "haloperidol",
-    # Mood stabilizers
-    "lamictal": "lamotrigine",
-    "tegretol": "carbamazepine",
-    "depakote": "valproate",
-    # Other psych
-    "wellbutrin": "bupropion",
-    "ativan": "lorazepam",
-    "klonopin": "clonazepam",
-    "ambien": "zolpidem",
-    "buspar": "buspirone"
-}
-# Include reverse mappings
-for brand, generic in list(MED_SYNONYMS.items()):
-    MED_SYNONYMS[generic] = generic
-
-# For display: brand/generic pretty mapping
-DISPLAY_NAME = {
-    "escitalopram": "escitalopram (Lexapro)",
-    "citalopram": "citalopram (Celexa)",
-    "paroxetine": "paroxetine (Paxil)",
-    "fluoxetine": "fluoxetine (Prozac)",
-    "sertraline": "sertraline (Zoloft)",
-    "venlafaxine": "venlafaxine (Effexor)",
-    "duloxetine": "duloxetine (Cymbalta)",
-    "aripiprazole": "aripiprazole (Abilify)",
-    "risperidone": "risperidone (Risperdal)",
-    "olanzapine": "olanzapine (Zyprexa)",
-    "quetiapine": "quetiapine (Seroquel)",
-    "ziprasidone": "ziprasidone (Geodon)",
-    "haloperidol": "haloperidol (Haldol)",
-    "lamotrigine": "lamotrigine (Lamictal)",
-    "carbamazepine": "carbamazepine (Tegretol)",
-    "valproate": "valproate (Depakote)",
-    "bupropion": "bupropion (Wellbutrin)",
-    "lorazepam": "lorazepam (Ativan)",
-    "clonazepam": "clonazepam (Klonopin)",
-    "zolpidem": "zolpidem (Ambien)",
-    "buspirone": "buspirone (Buspar)",
-}
-def normalize_med_name(med):
-    """Returns canonical generic med name, and display string with brand."""
-    key = med.strip().lower()
-    generic = MED_SYNONYMS.get(key, key)
-    display = DISPLAY_NAME.get(generic, generic.capitalize())
-    return generic, display
-# ---- Combined list of all unique med names for autocomplete ----
-ALL_MEDS = sorted(set(list(MED_SYNONYMS.keys()) + list(MED_SYNONYMS.values())))
-# Show both brand and generic in dropdown options
-ALL_MEDS_DISPLAY = []
-for med in ALL_MEDS:
-    gen, disp = normalize_med_name(med)
-    if disp not in ALL_MEDS_DISPLAY:
-        ALL_MEDS_DISPLAY.append(disp)
-# ----------------------- Drug Class Mapping -----------------------
-DRUG_CLASSES = {
-    # Antipsychotics
-    "aripiprazole": "Antipsychotic",
-    "risperidone": "Antipsychotic",
-    "olanzapine": "Antipsychotic",
-    "quetiapine": "Antipsychotic",
-    "ziprasidone": "Antipsychotic",
-    "haloperidol": "Antipsychotic",
-    # SSRIs
-    "escitalopram": "SSRI",
-    "citalopram": "SSRI",
-    "paroxetine": "SSRI",
-    "fluoxetine": "SSRI",
-    "sertraline": "SSRI",
-    # SNRIs
-    "venlafaxine": "SNRI",
-    "duloxetine": "SNRI",
-    # Mood stabilizers
-    "lamotrigine": "Mood stabilizer",
-    "carbamazepine": "Mood stabilizer",
-    "valproate": "Mood stabilizer",
-    # Anxiolytics/Sedatives
-    "clonazepam": "Benzodiazepine",
-    "lorazepam": "Benzodiazepine",
-    "zolpidem": "Sedative/Hypnotic",
-    "buspirone": "Anxiolytic",
-    # Add others as needed
-}
-# ----------------------- Phenoconversion Inhibitors/Inducers -----------------------
-PHENOCONVERT = {
-    "CYP2D6": {
-        "strong_inhibitors": ["paroxetine", "fluoxetine", "bupropion"],
-        "moderate_inhibitors": [],
-        "inducers": []
-    },
-    "CYP2C19": {
-        "strong_inhibitors": ["fluvoxamine", "fluoxetine"],
-        "moderate_inhibitors": [],
-        "inducers": ["carbamazepine"]
-    },
-    "CYP3A4": {
-        "strong_inhibitors": ["ritonavir", "ketoconazole"],
-        "moderate_inhibitors": ["fluvoxamine"],
-        "inducers": ["carbamazepine"]
-    },
-    "CYP1A2": {
-        "strong_inhibitors": ["fluvoxamine"],
-        "moderate_inhibitors": [],
-        "inducers": ["carbamazepine", "smoking"]
-    }
-}
-
-# --------------- Example PGX_FACTORS, FLOWSHEET_PROMPTS, CLINICAL_COMMENTS, PRIOR_RISKS ---------------
-# Use your latest/expanded dictionaries here (truncated for brevity in this sample)
-PGX_FACTORS = {
-    # --- Antipsychotics ---
-    ("CYP2D6", "Poor Metabolizer", "risperidone"): 3,
-    ("CYP2D6", "Poor Metabolizer", "aripiprazole"): 2.5,
-    ("CYP2D6", "Poor Metabolizer", "haloperidol"): 2.5,
-    ("CYP3A4", "Decreased Function", "quetiapine"): 2,
-    ("CYP1A2", "Ultra-rapid Metabolizer", "olanzapine"): 0.5,
-    ("CYP1A2", "Ultra-rapid Metabolizer", "clozapine"): 0.5,
-    ("CYP3A5", "Poor Metabolizer", "quetiapine"): 0.5,
-    ("CYP3A5", "Intermediate Metabolizer", "quetiapine"): 0.8,
-    
-    # --- SSRIs/SNRIs ---
-    ("CYP2C19", "Ultra-rapid Metabolizer", "citalopram"): 0.4,
-    ("CYP2C19", "Poor Metabolizer", "citalopram"): 2,
-    ("CYP2C19", "Ultra-rapid Metabolizer", "escitalopram"): 0.5,
-    ("CYP2C19", "Poor Metabolizer", "escitalopram"): 1.8,
-    ("CYP2D6", "Poor Metabolizer", "paroxetine"): 2,
-    ("CYP2D6", "Poor Metabolizer", "fluoxetine"): 1.5,
-    ("CYP2D6", "Poor Metabolizer", "venlafaxine"): 2,
-    ("CYP2D6", "Poor Metabolizer", "duloxetine"): 1.5,
-
-    # --- Mood stabilizers ---
-    ("CYP2C19", "Poor Metabolizer", "lamotrigine"): 1.2,
-    ("CYP2C9", "Poor Metabolizer", "valproate"): 1.4,
-    ("CYP2C9", "Poor Metabolizer", "phenytoin"): 2.2,
-    ("CYP2C9", "Intermediate Metabolizer", "phenytoin"): 1.4,
-    ("CYP2C9", "Poor Metabolizer", "valproate"): 1.4,
-    ("UGT1A4", "Poor Metabolizer", "lamotrigine"): 1.3,
-    ("HLA-A*31:01", "Positive", "carbamazepine"): 5,  # strong contraindication
-    ("HLA-A*31:01", "Positive", "oxcarbazepine"): 5,
-    ("HLA-B*15:02", "Positive", "carbamazepine"): 5,  # strong contraindication
-    ("HLA-B*15:02", "Positive", "oxcarbazepine"): 5,
-    
-    # --- Anxiolytics/Sleep ---
-    ("CYP3A4", "Decreased Function", "alprazolam"): 1.7,
-    ("CYP2C19", "Poor Metabolizer", "diazepam"): 1.6,
-    ("CYP3A4", "Decreased Function", "zolpidem"): 1.5,
-    ("UGT2B15", "Poor Metabolizer", "lorazepam"): 2.2,
-    ("UGT2B15", "Poor Metabolizer", "oxazepam"): 2.2,
-    
-    # --- Pharmacodynamic/Transporters/Other ---
-    ("HTR2A", "A/A", "sertraline"): 0.7,
-    ("SLC6A4", "S/S", "sertraline"): 0.7,
-    ("COMT", "Val/Val", "bupropion"): 0.8,
-    ("CYP2B6", "Poor Metabolizer", "bupropion"): 2,
-    ("CYP2B6", "Intermediate Metabolizer", "bupropion"): 1.2,
-    ("MTHFR", "C/T", "any"): 0.2,  # placeholder
-    ("MTHFR", "A/C", "any"): 0.2,
-}
-FLOWSHEET_PROMPTS = {
-    # --- Antipsychotics ---
-    ("CYP2D6", "Poor Metabolizer", "risperidone"): ["Monitor for tremor", "Assess for EPS", "Check for sedation"],
-    ("CYP2D6", "Poor Metabolizer", "aripiprazole"): ["Monitor for akathisia", "Check for restlessness"],
-    ("CYP2D6", "Poor Metabolizer", "haloperidol"): ["Assess for rigidity", "Monitor for neurotoxicity"],
-    ("CYP3A4", "Decreased Function", "quetiapine"): ["Check for sedation", "Monitor blood pressure (orthostasis)"],
-    ("CYP1A2", "Ultra-rapid Metabolizer", "olanzapine"): ["Assess for decreased efficacy", "Monitor weight/appetite"],
-
-    # --- SSRIs/SNRIs ---
-    ("CYP2C19", "Ultra-rapid Metabolizer", "citalopram"): ["Assess for lack of effect", "Monitor mood symptoms"],
-    ("CYP2C19", "Poor Metabolizer", "citalopram"): ["Monitor for QT prolongation", "Check for GI upset"],
-    ("CYP2D6", "Poor Metabolizer", "paroxetine"): ["Assess for anticholinergic effects", "Monitor for sedation"],
-    ("CYP2D6", "Poor Metabolizer", "fluoxetine"): ["Check for insomnia", "Monitor for GI side effects"],
-
-    # --- Mood stabilizers ---
-    ("CYP2C19", "Poor Metabolizer", "lamotrigine"): ["Monitor for rash", "Assess for dizziness"],
-    ("CYP2C9", "Poor Metabolizer", "valproate"): ["Monitor LFTs", "Check for thrombocytopenia"],
-
-    # --- Anxiolytics/Sleep ---
-    ("CYP3A4", "Decreased Function", "alprazolam"): ["Monitor for sedation", "Assess fall risk"],
-    ("CYP2C19", "Poor Metabolizer", "diazepam"): ["Check for prolonged sedation", "Assess confusion"],
-    ("CYP3A4", "Decreased Function", "zolpidem"): ["Monitor for next-day drowsiness"],
-
-    # --- Pharmacodynamic/Transporters ---
-    ("HTR2A", "A/A", "sertraline"): ["Monitor for lack of SSRI effect"],
-    ("SLC6A4", "S/S", "sertraline"): ["Assess for SSRI intolerance"],
-    ("COMT", "Val/Val", "bupropion"): ["Monitor for low response", "Check for irritability"],
-
-    # --- Expanded Tempus Panel Genes ---
-
-    # CYP2B6 - relevant for bupropion
-    ("CYP2B6", "Poor Metabolizer", "bupropion"): ["Monitor for agitation or insomnia", "Assess for bupropion toxicity (e.g., seizures)"],
-    ("CYP2B6", "Intermediate Metabolizer", "bupropion"): ["Monitor for bupropion side effects","Assess efficacy at usual dose"],
-
-    # CYP2C9 - impacts phenytoin/valproate
-    ("CYP2C9", "Poor Metabolizer", "phenytoin"): ["Monitor phenytoin levels closely","Assess for ataxia or nystagmus"],
-    ("CYP2C9", "Poor Metabolizer", "valproate"): ["Monitor LFTs","Check for GI side effects"],
-
-    # CYP3A5 - less common, but can impact clearance
-    ("CYP3A5", "Poor Metabolizer", "quetiapine"): ["Monitor for sedation","Assess for excessive drowsiness"],
-    ("CYP3A5", "Intermediate Metabolizer", "quetiapine"): ["Monitor for quetiapine side effects","Check for dizziness"],
-
-    # UGT1A4 - impacts lamotrigine
-    ("UGT1A4", "Poor Metabolizer", "lamotrigine"): ["Monitor for increased lamotrigine side effects","Assess for dizziness or diplopia"],
-
-    # UGT2B15 - impacts lorazepam, oxazepam
-    ("UGT2B15", "Poor Metabolizer", "lorazepam"): ["Monitor for excessive sedation","Assess for respiratory depression"],
-    ("UGT2B15", "Poor Metabolizer", "oxazepam"): ["Monitor for prolonged sedation","Check for confusion"],
-
-    # HLA-A*31:01 - SJS/TEN risk
-    ("HLA-A*31:01", "Positive", "carbamazepine"): ["Do NOT administer—risk of severe skin reaction (SJS/TEN)","Alert provider immediately"],
-    ("HLA-A*31:01", "Positive", "oxcarbazepine"): ["Do NOT administer—risk of severe skin reaction (SJS/TEN)","Alert provider immediately"],
-
-    # HLA-B*15:02 - SJS/TEN risk
-    ("HLA-B*15:02", "Positive", "carbamazepine"): ["Do NOT administer—risk of Stevens-Johnson Syndrome","Alert provider immediately"],
-    ("HLA-B*15:02", "Positive", "oxcarbazepine"): ["Do NOT administer—risk of Stevens-Johnson Syndrome","Alert provider immediately"],
-
-    # MTHFR - not directly actionable, but can document
-    ("MTHFR", "C/T", "any"): ["Document folate metabolism variant","Consider folate supplementation if clinically indicated"],
-    ("MTHFR", "A/C", "any"): ["Document folate metabolism variant","Monitor for neuropsychiatric symptoms if relevant"],
-
-}
-
-CLINICAL_COMMENTS = {
-    # --- Antipsychotics ---
-    ("CYP2D6", "Poor Metabolizer", "risperidone"):
-        "CYP2D6 Poor Metabolizer status reduces risperidone clearance, causing the drug to accumulate in the bloodstream. "
-        "This increases the risk of extrapyramidal side effects (EPS), sedation, and toxicity. "
-        "Consider lowering the dose or switching to a medication less dependent on CYP2D6 metabolism. "
-        "[CPIC Guideline](https://cpicpgx.org/guidelines/) | [PharmGKB Risperidone](https://www.pharmgkb.org/chemical/PA451257).",
-
-    ("CYP2D6", "Poor Metabolizer", "aripiprazole"):
-        "Poor CYP2D6 metabolism slows aripiprazole clearance, raising blood concentrations and increasing risk of side effects such as akathisia, sedation, and QT prolongation. "
-        "A dose reduction or alternative therapy may be appropriate. "
-        "[CPIC Guideline](https://cpicpgx.org/guidelines/) | [PharmGKB Aripiprazole](https://www.pharmgkb.org/chemical/PA10026).",
-
-    ("CYP2D6", "Poor Metabolizer", "haloperidol"):
-        "Reduced CYP2D6 function decreases haloperidol metabolism, which can lead to higher blood levels and increased risk of EPS, neurotoxicity, or cardiac adverse events. Careful monitoring or dose adjustment is recommended. "
-        "[CPIC Guideline](https://cpicpgx.org/guidelines/) | [PharmGKB Haloperidol](https://www.pharmgkb.org/chemical/PA449841).",
-
-    ("CYP3A4", "Decreased Function", "quetiapine"):
-        "Quetiapine is primarily metabolized by CYP3A4. Decreased function can lead to elevated quetiapine concentrations, increasing sedation, orthostatic hypotension, and risk of toxicity. Dose reduction may be needed. "
-        "[CPIC Guideline](https://cpicpgx.org/guidelines/) | [PharmGKB Quetiapine](https://www.pharmgkb.org/chemical/PA451201).",
-
-    ("CYP1A2", "Ultra-rapid Metabolizer", "olanzapine"):
-        "Ultra-rapid CYP1A2 metabolism increases olanzapine clearance, potentially resulting in subtherapeutic levels and decreased efficacy, especially in smokers. Consider higher doses or alternate agents. "
-        "[CPIC Guideline](https://cpicpgx.org/guidelines/) | [PharmGKB Olanzapine](https://www.pharmgkb.org/chemical/PA450688).",
-
-    ("CYP1A2", "Ultra-rapid Metabolizer", "clozapine"):
-        "Ultra-rapid metabolism leads to low clozapine levels, risking therapeutic failure. Monitor response and consider dose adjustment. "
-        "[CPIC Guideline](https://cpicpgx.org/guidelines/) | [PharmGKB Clozapine](https://www.pharmgkb.org/chemical/PA449061).",
-    
-    ("CYP3A4", "Decreased Function", "ziprasidone"):
-        "Ziprasidone is primarily metabolized by CYP3A4, but there are currently no actionable pharmacogenomic recommendations. Standard care applies. "
-        "[PharmGKB Ziprasidone](https://www.pharmgkb.org/chemical/PA451974).",
-
-    # --- SSRIs/SNRIs ---
-    ("CYP2C19", "Ultra-rapid Metabolizer", "citalopram"):
-        "CYP2C19 ultra-rapid metabolism clears citalopram more quickly, which can result in subtherapeutic plasma concentrations and poor antidepressant response. "
-        "Consider an SSRI less affected by CYP2C19 or increase the dose if clinically appropriate. "
-        "[CPIC Guideline](https://cpicpgx.org/guidelines/cpic-guideline-for-ssri-and-snri-antidepressants/) | [PharmGKB Citalopram](https://www.pharmgkb.org/chemical/PA449015).",
-
-    ("CYP2C19", "Poor Metabolizer", "citalopram"):
-        "Poor CYP2C19 metabolism raises citalopram levels, increasing the risk of QT prolongation and other side effects. Dose reduction or close monitoring is recommended. "
-        "[CPIC Guideline](https://cpicpgx.org/guidelines/cpic-guideline-for-ssri-and-snri-antidepressants/) | [PharmGKB Citalopram](https://www.pharmgkb.org/chemical/PA449015).",
-
-    ("CYP2C19", "Ultra-rapid Metabolizer", "escitalopram"):
-        "Faster metabolism of escitalopram may cause lower drug levels and reduced antidepressant effect. Monitor for lack of response. "
-        "[CPIC Guideline](https://cpicpgx.org/guidelines/cpic-guideline-for-ssri-and-snri-antidepressants/) | [PharmGKB Escitalopram](https://www.pharmgkb.org/chemical/PA10074).",
-
-    ("CYP2C19", "Poor Metabolizer", "escitalopram"):
-        "Reduced metabolism raises escitalopram blood levels, increasing the risk of side effects, including QT prolongation. Consider lower doses or more frequent monitoring. "
-        "[CPIC Guideline](https://cpicpgx.org/guidelines/cpic-guideline-for-ssri-and-snri-antidepressants/) | [PharmGKB Escitalopram](https://www.pharmgkb.org/chemical/PA10074).",
-
-    ("CYP2D6", "Poor Metabolizer", "paroxetine"):
-        "CYP2D6 Poor Metabolizer status leads to slow paroxetine clearance, resulting in drug accumulation and a higher risk of anticholinergic effects, sedation, and sexual dysfunction. Dose reduction or switching medications may be needed. "
-        "[CPIC Guideline](https://cpicpgx.org/guidelines/cpic-guideline-for-ssri-and-snri-antidepressants/) | [PharmGKB Paroxetine](https://www.pharmgkb.org/chemical/PA450801).",
-
-    ("CYP2D6", "Poor Metabolizer", "fluoxetine"):
-        "Reduced CYP2D6 activity increases fluoxetine levels, elevating risk of side effects such as insomnia, GI upset, and serotonin syndrome. Monitor and consider dose reduction. "
-        "[CPIC Guideline](https://cpicpgx.org/guidelines/cpic-guideline-for-ssri-and-snri-antidepressants/) | [PharmGKB Fluoxetine](https://www.pharmgkb.org/chemical/PA449673).",
-
-    ("CYP2D6", "Poor Metabolizer", "venlafaxine"):
-        "Venlafaxine is metabolized to its active metabolite by CYP2D6. Poor metabolism may cause higher venlafaxine and lower active metabolite levels, leading to reduced efficacy and increased side effects. Adjust therapy as needed. "
-        "[CPIC Guideline](https://cpicpgx.org/guidelines/cpic-guideline-for-ssri-and-snri-antidepressants/) | [PharmGKB Venlafaxine](https://www.pharmgkb.org/chemical/PA451866).",
-
-    ("CYP2D6", "Poor Metabolizer", "duloxetine"):
-        "Slow CYP2D6 metabolism raises duloxetine concentrations, increasing the risk of side effects such as nausea, hypertension, and liver toxicity. Lower doses or alternative therapy may be appropriate. "
-        "[CPIC Guideline](https://cpicpgx.org/guidelines/cpic-guideline-for-ssri-and-snri-antidepressants/) | [PharmGKB Duloxetine](https://www.pharmgkb.org/chemical/PA10066).",
-
-    # --- Mood Stabilizers/Other Psych ---
-     ("CYP2C19", "Poor Metabolizer", "lamotrigine"):
-        "Poor CYP2C19 metabolism may result in higher lamotrigine levels, which can increase the risk of rash and other adverse effects. Monitor closely. "
-        "[PharmGKB Lamotrigine](https://www.pharmgkb.org/chemical/PA450164).",
-
-    ("CYP2C9", "Poor Metabolizer", "valproate"):
-        "Valproate clearance is reduced in CYP2C9 poor metabolizers, raising blood levels and risk of toxicity, including liver damage and thrombocytopenia. Dose adjustment and monitoring recommended. "
-        "[PharmGKB Valproic Acid](https://www.pharmgkb.org/chemical/PA451846).",
-
-    ("CYP2C19", "Ultra-rapid Metabolizer", "clobazam"):
-        "Faster metabolism may result in lower clobazam levels, possibly reducing efficacy in seizure control or anxiety treatment. "
-        "[PharmGKB Clobazam](https://www.pharmgkb.org/chemical/PA10888).",
-
-    # --- Anxiety/Sleep ---
-    ("CYP3A4", "Decreased Function", "alprazolam"):
-        "Decreased CYP3A4 activity leads to slower alprazolam metabolism, increasing sedation, confusion, and fall risk, especially in older adults. "
-        "[PharmGKB Alprazolam](https://www.pharmgkb.org/chemical/PA448333).",
-
-    ("CYP2C19", "Poor Metabolizer", "diazepam"):
-        "Poor metabolism of diazepam leads to drug accumulation, prolonging sedation and increasing risk of adverse effects. "
-        "[CPIC Guideline](https://cpicpgx.org/guidelines/) | [PharmGKB Diazepam](https://www.pharmgkb.org/chemical/PA449283).",
-
-    ("CYP3A4", "Decreased Function", "zolpidem"):
-        "Zolpidem is cleared by CYP3A4. Decreased function can result in prolonged sedation and next-day drowsiness. Lower doses or alternate sleep aids may be needed. "
-        "[PharmGKB Zolpidem](https://www.pharmgkb.org/chemical/PA451976).",
-    ("CYP2D6", "Poor Metabolizer", "buspirone"):
-        "Buspirone: No clinically significant pharmacogenomic drug-gene interactions have been established. Standard dosing and monitoring apply. "
-        "[PharmGKB Buspirone](https://www.pharmgkb.org/chemical/PA448689).",
-    ("CYP3A4", "Decreased Function", "buspirone"):
-        "Buspirone: While metabolized by CYP3A4, no actionable gene-drug interactions are established in clinical guidelines. "
-        "[PharmGKB Buspirone](https://www.pharmgkb.org/chemical/PA448689).",
-    ("CYP3A4", "Decreased Function", "clonazepam"):
-        "Clonazepam: CYP3A4 plays a role in metabolism, but no clinically actionable PGx recommendations are currently available. "
-        "[PharmGKB Clonazepam](https://www.pharmgkb.org/chemical/PA449050).",
-
-    ("UGT1A4", "Poor Metabolizer", "clonazepam"):
-        "Clonazepam: Glucuronidation is the major metabolic pathway, but current evidence does not support actionable pharmacogenomic guidance. "
-        "[PharmGKB Clonazepam](https://www.pharmgkb.org/chemical/PA449050).",
-
-    ("UGT2B7", "Poor Metabolizer", "lorazepam"):
-        "Lorazepam is metabolized by glucuronidation (UGT2B7). No clinically significant pharmacogenomic effects have been reported. Use standard dosing and monitoring. "
-        "[PharmGKB Lorazepam](https://www.pharmgkb.org/chemical/PA450267).",
-    # --- Transporter/Pharmacodynamic Markers ---
-    ("HTR2A", "A/A", "sertraline"):
-        "HTR2A A/A genotype may reduce SSRI efficacy, possibly requiring dose escalation or alternative antidepressants. "
-        "[PharmGKB Sertraline](https://www.pharmgkb.org/chemical/PA451333).",
-
-    ("SLC6A4", "S/S", "sertraline"):
-        "S/S genotype of SLC6A4 (5-HTTLPR) is associated with poorer SSRI tolerance and reduced likelihood of response. Consider alternative therapy if ineffective or poorly tolerated. "
-        "[PharmGKB Sertraline](https://www.pharmgkb.org/chemical/PA451333).",
-
-    ("COMT", "Val/Val", "bupropion"):
-        "COMT Val/Val may increase dopamine breakdown, possibly reducing bupropion efficacy in treating depression or ADHD. Clinical significance varies. "
-        "[PharmGKB Bupropion](https://www.pharmgkb.org/chemical/PA448687).",
-    # --- Expanded Tempus Panel Clinical Comments ---
-
-    ("CYP2B6", "Poor Metabolizer", "bupropion"):
-        "CYP2B6 Poor Metabolizer status impairs bupropion clearance, increasing plasma concentrations and risk of adverse effects such as agitation, insomnia, or, rarely, seizures. Dose reduction or alternative therapy may be needed. "
-        "[FDA Label](https://dailymed.nlm.nih.gov/dailymed/drugInfo.cfm?setid=4956af38-182a-4015-a945-67e40bd38772) | [PharmGKB Bupropion](https://www.pharmgkb.org/chemical/PA448687).",
-
-    ("CYP2B6", "Intermediate Metabolizer", "bupropion"):
-        "Intermediate CYP2B6 activity can moderately reduce bupropion clearance, raising exposure and side effect risk. Monitor for adverse reactions and adjust dose if clinically warranted. "
-        "[FDA Label](https://dailymed.nlm.nih.gov/dailymed/drugInfo.cfm?setid=4956af38-182a-4015-a945-67e40bd38772) | [PharmGKB Bupropion](https://www.pharmgkb.org/chemical/PA448687).",
-
-    ("CYP2C9", "Poor Metabolizer", "phenytoin"):
-        "CYP2C9 Poor Metabolizer status leads to significantly reduced phenytoin clearance, increasing toxicity risk (e.g., ataxia, nystagmus, CNS effects). Consider alternative therapy or substantial dose reduction with frequent monitoring. "
-        "[CPIC Phenytoin Guideline](https://cpicpgx.org/guidelines/guideline-for-phenytoin/) | [PharmGKB Phenytoin](https://www.pharmgkb.org/chemical/PA451094).",
-
-    ("CYP2C9", "Poor Metabolizer", "valproate"):
-        "Poor CYP2C9 metabolism can elevate valproate concentrations, increasing risk for hepatotoxicity, thrombocytopenia, and other adverse effects. Dose adjustment and regular monitoring are recommended. "
-        "[FDA Label](https://dailymed.nlm.nih.gov/dailymed/drugInfo.cfm?setid=82d29262-c72b-48d1-8471-5d582b3496ea) | [PharmGKB Valproic Acid](https://www.pharmgkb.org/chemical/PA451846).",
-
-    ("CYP3A5", "Poor Metabolizer", "quetiapine"):
-        "Reduced CYP3A5 activity may contribute to higher quetiapine concentrations, especially in patients with decreased CYP3A4. Monitor for increased sedation and adverse effects. "
-        "[FDA Label](https://dailymed.nlm.nih.gov/dailymed/drugInfo.cfm?setid=0584dda8-bc3c-48fe-1a90-79608f78e8a0) | [PharmGKB Quetiapine](https://www.pharmgkb.org/chemical/PA451201).",
-
-    ("CYP3A5", "Intermediate Metabolizer", "quetiapine"):
-        "Intermediate CYP3A5 activity can result in modestly increased quetiapine exposure. Monitor for sedation and titrate dose if needed. "
-        "[FDA Label](https://dailymed.nlm.nih.gov/dailymed/drugInfo.cfm?setid=0584dda8-bc3c-48fe-1a90-79608f78e8a0) | [PharmGKB Quetiapine](https://www.pharmgkb.org/chemical/PA451201).",
-
-    ("UGT1A4", "Poor Metabolizer", "lamotrigine"):
-        "Poor UGT1A4 metabolism can slow lamotrigine clearance, increasing plasma levels and risk for adverse effects (e.g., dizziness, rash). Consider slower titration and close monitoring. "
-        "[FDA Label](https://dailymed.nlm.nih.gov/dailymed/drugInfo.cfm?setid=0b0f0209-edbd-46f3-9bed-762cbea0d737) | [PharmGKB Lamotrigine](https://www.pharmgkb.org/chemical/PA450164).",
-
-    ("UGT2B15", "Poor Metabolizer", "lorazepam"):
-        "UGT2B15 Poor Metabolizer status reduces lorazepam clearance, increasing risk for prolonged sedation and CNS depression. Consider lower initial dosing and monitor closely, especially in older adults. "
-        "[PMID: 15961980](https://pubmed.ncbi.nlm.nih.gov/15961980/) | [PharmGKB Lorazepam](https://www.pharmgkb.org/chemical/PA450267).",
-
-    ("UGT2B15", "Poor Metabolizer", "oxazepam"):
-        "Reduced UGT2B15 activity impairs oxazepam clearance, raising exposure and risk of sedation. Start with lower doses and monitor response. "
-        "[PMID: 15044558](https://pubmed.ncbi.nlm.nih.gov/15044558/) | [PharmGKB Oxazepam](https://www.pharmgkb.org/chemical/PA450731).",
-
-    ("HLA-A*31:01", "Positive", "carbamazepine"):
-        "HLA-A*31:01 positivity is strongly associated with increased risk of carbamazepine-induced hypersensitivity reactions, including SJS/TEN. Do NOT initiate carbamazepine; choose alternatives. "
-        "[PharmGKB Carbamazepine](https://www.pharmgkb.org/chemical/PA448785).",
-
-    ("HLA-A*31:01", "Positive", "oxcarbazepine"):
-        "Patients positive for HLA-A*31:01 have higher risk for severe cutaneous adverse reactions with oxcarbazepine. Avoid use and select non-aromatic anticonvulsants. "
-        "[PharmGKB Oxcarbazepine](https://www.pharmgkb.org/chemical/PA450083).",
-
-    ("HLA-B*15:02", "Positive", "carbamazepine"):
-        "HLA-B*15:02 is associated with life-threatening SJS/TEN after carbamazepine exposure, especially in patients of Asian ancestry. **Contraindicated**—do not prescribe. "
-        "[PharmGKB Carbamazepine](https://www.pharmgkb.org/chemical/PA448785).",
-
-    ("HLA-B*15:02", "Positive", "oxcarbazepine"):
-        "HLA-B*15:02 carriers are at high risk for Stevens-Johnson Syndrome and toxic epidermal necrolysis with oxcarbazepine. Avoid use—select an alternative agent. "
-        "[PharmGKB Oxcarbazepine](https://www.pharmgkb.org/chemical/PA450083).",
-
-    ("MTHFR", "C/T", "any"):
-        "MTHFR variants may impact folate metabolism, but routine clinical action in psychiatric care is not established. Consider folate supplementation only if deficiency suspected or clinically indicated. "
-        "[PharmGKB MTHFR](https://www.pharmgkb.org/gene/PA162373209).",
-
-    ("MTHFR", "A/C", "any"):
-        "A/C variant in MTHFR may affect folate pathways; direct pharmacogenomic action for psychiatric medication selection is not currently recommended. "
-        "[PharmGKB MTHFR](https://www.pharmgkb.org/gene/PA162373209).",
-}
-PRIOR_RISKS = {
-    "risperidone": 0.1,
-    "aripiprazole": 0.07,
-    "haloperidol": 0.12,
-    "quetiapine": 0.07,
-    "olanzapine": 0.05,
-    "clozapine": 0.04,
-    "citalopram": 0.08,
-    "escitalopram": 0.07,
-    "paroxetine": 0.09,
-    "fluoxetine": 0.06,
-    "sertraline": 0.05,
-    "venlafaxine": 0.09,
-    "duloxetine": 0.06,
-    "lamotrigine": 0.03,
-    "valproate": 0.1,
-    "clobazam": 0.03,
-    "alprazolam": 0.05,
-    "diazepam": 0.04,
-    "zolpidem": 0.03,
-    "bupropion": 0.05,
-    "buspirone": 0.02,
-    "ziprasidone": 0.06,
-    "clonazepam": 0.05,
-    "lorazepam": 0.04,
-}
+from pdf_text import parse_pdf
 
+# Reference tables live in cds_tables.py (imported once, not rebuilt per rerun)
+from cds_tables import (
+    DISPLAY_NAME, DISP_TO_GENERIC, ALL_MEDS_DISPLAY, DRUG_CLASSES,
+    MED_EFFECTS, PRIOR_RISKS, HIGH_RISK_SYMPTOMS, PGX_BY_DRUG
+)
 
 # ----------------------- Utility Functions -----------------------
 
-
-def parse_pdf(file):
-    pdf = PdfReader(file)
-    text = ''
-    for page in pdf.pages:
-        if page.extract_text():
-            text += page.extract_text()
+# ---- Disk cache for extracted PDF text (survives app restarts/sessions) ----
+# Note: stores the extracted report text under the user's home directory,
+# in a directory and files readable only by the app's user.
+PDF_CACHE_DIRNAME = ".pgx_cache"
+PDF_CACHE_MAX_FILES = 32
+
+def parse_pdf_disk_cached(file_bytes):
+    """Returns PDF text, reusing the saved copy if this exact file was parsed before."""
+    digest = hashlib.blake2b(file_bytes, digest_size=16).hexdigest()
+    try:
+        # Resolved per call: Path.home() raises RuntimeError when there is no home directory
+        cache_dir = Path.home() / PDF_CACHE_DIRNAME
+    except RuntimeError:
+        return parse_pdf(io.BytesIO(file_bytes))
+    cache_path = cache_dir / f"{digest}.txt"
+    try:
+        # surrogatepass: PyPDF2 can emit lone surrogates, which are saved as-is
+        text = cache_path.read_text(encoding="utf-8", errors="surrogatepass")
+    except (OSError, ValueError):
+        text = None
+    if text is not None:
+        try:
+            cache_path.touch()  # mark as recently used for eviction
+        except OSError:
+            pass  # read-only cache: still serve the saved text
+        return text
+    text = parse_pdf(io.BytesIO(file_bytes))
+    try:
+        cache_dir.mkdir(mode=0o700, exist_ok=True)
+        cache_dir.chmod(0o700)  # mkdir's mode does not apply to an existing directory
+        # Write a private (0600) temp file and rename it into place, so a concurrent
+        # reader or an interrupted write never sees a partial report
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", errors="surrogatepass") as tmp:
+                tmp.write(text)
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        # Keep only the most recently used files
+        cached = sorted(cache_dir.glob("*.txt"), key=lambda p: p.stat().st_mtime, reverse=True)
+        for stale in cached[PDF_CACHE_MAX_FILES:]:
+            stale.unlink(missing_ok=True)
+    except (OSError, ValueError):
+        pass  # caching is best-effort (e.g. read-only filesystem, undecodable text)
     return text
 
 import re
 
+GENE_PANEL = (
+    "CYP1A2", "CYP2B6", "CYP2C19", "CYP2C9", "CYP2D6",
+    "CYP3A4", "CYP3A5", "UGT1A4", "UGT2B15",
+    "HTR2A", "SLC6A4", "HLA-A*31:01", "HLA-B*15:02",
+    "MTHFR", "COMT"
+)
+# Listed in priority order: the first keyword found on a line wins
+PHENOTYPE_KEYWORDS = (
+    "Normal Metabolizer", "Poor Metabolizer", "Intermediate Metabolizer",
+    "Ultra-rapid Metabolizer", "Decreased Function", "Increased Risk",
+    "Positive", "Negative", "Val/Val", "A/C", "C/T", "Short/Short", "Short", "Long"
+)
+PHENOTYPE_RANK = {keyword: i for i, keyword in enumerate(PHENOTYPE_KEYWORDS)}
+# Report text is matched with "*" removed. HLA alleles are often printed apart from
+# the gene name (e.g. "HLA-A ... 31:01"), so they match in either order on a line.
+GENE_PATTERNS = {gene: re.escape(gene.replace("*", "")) for gene in GENE_PANEL}
+GENE_PATTERNS["HLA-A*31:01"] = "HLA-A.*31:01|31:01.*HLA-A"
+GENE_PATTERNS["HLA-B*15:02"] = "HLA-B.*15:02|15:02.*HLA-B"
+# Named group per gene (g0, g1, ...) so a match maps straight back to its panel name
+GENE_BY_GROUP = {f"g{i}": gene for i, gene in enumerate(GENE_PATTERNS)}
+
+# One compiled scan per line instead of a substring test per gene/keyword.
+# The lookahead form reports overlapping hits, matching plain "in" semantics.
+GENE_RE = re.compile(
+    "(?=" + "|".join(f"(?P<g{i}>{pattern})" for i, pattern in enumerate(GENE_PATTERNS.values())) + ")"
+)
+PHENOTYPE_RE = re.compile("(?=(" + "|".join(re.escape(k) for k in PHENOTYPE_KEYWORDS) + "))")
+
 def extract_genes_from_text(text):
-    gene_panel = [
-        "CYP1A2", "CYP2B6", "CYP2C19", "CYP2C9", "CYP2D6",
-        "CYP3A4", "CYP3A5", "UGT1A4", "UGT2B15",
-        "HTR2A", "SLC6A4", "HLA-A*31:01", "HLA-B*15:02",
-        "MTHFR", "COMT"
-    ]
-    phenotype_keywords = [
-        "Normal Metabolizer", "Poor Metabolizer", "Intermediate Metabolizer",
-        "Ultra-rapid Metabolizer", "Decreased Function", "Increased Risk",
-        "Positive", "Negative", "Val/Val", "A/C", "C/T", "Short/Short", "Short", "Long"
-    ]
-    genes = []
-    found_genes = set()
-    for gene in gene_panel:
-        gene_stripped = gene.replace("*", "")
-        for line in text.splitlines():
-            line_stripped = line.replace("*", "")
-            if gene_stripped in line_stripped or (
-                gene.startswith("HLA-A") and "HLA-A" in line and "31:01" in line
-            ) or (
-                gene.startswith("HLA-B") and "HLA-B" in line and "15:02" in line
-            ):
-                for keyword in phenotype_keywords:
-                    if keyword in line:
-                        genes.append((gene, keyword))
-                        found_genes.add(gene)
-                        break
-    for gene in gene_panel:
-        if gene not in found_genes:
+    hits = {gene: [] for gene in GENE_PANEL}
+    # Strip "*" once for the whole report; "*" never splits lines, so the two stay aligned
+    stripped_lines = text.replace("*", "").splitlines()
+    for line, line_stripped in zip(text.splitlines(), stripped_lines):
+        found = {GENE_BY_GROUP[m.lastgroup] for m in GENE_RE.finditer(line_stripped)}
+        if not found:
+            continue
+        keywords = PHENOTYPE_RE.findall(line)
+        if not keywords:
+            continue
+        keyword = min(keywords, key=PHENOTYPE_RANK.__getitem__)
+        for gene in found:
+            hits[gene].append(keyword)
+    genes = [(gene, keyword) for gene in GENE_PANEL for keyword in hits[gene]]
+    for gene in GENE_PANEL:
+        if not hits[gene]:
             genes.append((gene, "Not Reported"))
     return genes
 
-def phenoconvert_genes(genes, meds, log):
-    # Make a copy so original isn't mutated
-    functional_genes = []
-    gene_set = set(g for g, _ in genes)
-    # Dict to allow updates (key: gene, value: (original, functional, caused_by))
-    gene_state = {}
-    for gene, phenotype in genes:
-        gene_state[gene] = {"genotype": phenotype, "functional": phenotype, "caused_by": []}
-    # Scan for inhibitors/inducers
-    for gene in gene_set:
-        inhibitors = PHENOCONVERT.get(gene, {})
-        for strength in ["strong_inhibitors", "moderate_inhibitors"]:
-            found = [m for m in meds if m in inhibitors.get(strength, [])]
-            if found:
-                if strength == "strong_inhibitors":
-                    gene_state[gene]["functional"] = "Poor Metabolizer"
-                    gene_state[gene]["caused_by"].extend(found)
-                    log.append(f"{gene}: Genotype = {gene_state[gene]['genotype']}, adjusted to Poor Metabolizer due to {', '.join(found)} (strong inhibitor).")
-                elif strength == "moderate_inhibitors" and gene_state[gene]["functional"] != "Poor Metabolizer":
-                    gene_state[gene]["functional"] = "Intermediate Metabolizer"
-                    gene_state[gene]["caused_by"].extend(found)
-                    log.append(f"{gene}: Genotype = {gene_state[gene]['genotype']}, adjusted to Intermediate Metabolizer due to {', '.join(found)} (moderate inhibitor).")
-        found_inducers = [m for m in meds if m in inhibitors.get("inducers", [])]
+# ---- Cached wrappers: Streamlit reruns the script on every interaction ----
+@st.cache_data(show_spinner=False)
+def _parse_pdf_cached(file_bytes):
+    return parse_pdf_disk_cached(file_bytes)
+
+@st.cache_data(show_spinner=False)
+def _extract_genes_cached(text):
+    return tuple(extract_genes_from_text(text))
+
+@st.cache_data(show_spinner=False)
+def _patient_rule_table(functional_genes):
+    """Per-med rules matching this patient's phenotypes, with the prior already applied:
+    med -> ((gene, phenotype, base_risk, prompts, comment), ...). Cached per phenotype set."""
+    # Intern the names so they compare by identity with the PGX_BY_DRUG rule rows;
+    # functional_genes comes from the cached _phenoconvert, so it arrives unpickled
+    patient_phenotypes = frozenset(
+        (sys.intern(gene), sys.intern(phenotype)) for gene, phenotype in functional_genes
+    )
+    table = {}
+    for med, rules in PGX_BY_DRUG.items():
+        prior_risk = PRIOR_RISKS.get(med, 0.05)
+        matched = tuple(
+            (gene, phenotype, prior_risk * pgx_factor, prompts, comment)
+            for gene, phenotype, pgx_factor, prompts, comment in rules
+            if (gene, phenotype) in patient_phenotypes
+        )
+        if matched:
+            table[med] = matched
+    return table
+
+@st.cache_data(show_spinner=False)
+def _phenoconvert(genes, meds):
+    """Applies inhibitor/inducer phenoconversion. Takes and returns tuples:
+    ((gene, genotype, functional, caused_by), ...) and the log lines."""
+    # One entry per gene; a later report line overrides an earlier one.
+    reported = dict(genes)
+    # Scan only the active meds for inhibitors/inducers: gene -> {role: [meds]}
+    effects = {}
+    for med in meds:
+        for gene, role in MED_EFFECTS.get(med, ()):
+            if gene in reported:
+                effects.setdefault(gene, {}).setdefault(role, []).append(med)
+    # Single pass in report order: strong -> PM, moderate -> IM (unless PM), inducers override.
+    states = []
+    log = []
+    for gene, genotype in reported.items():
+        functional = genotype
+        caused_by = []
+        found_by = effects.get(gene, {})
+        found = found_by.get("strong_inhibitors")
+        if found:
+            functional = "Poor Metabolizer"
+            caused_by.extend(found)
+            log.append(f"{gene}: Genotype = {genotype}, adjusted to Poor Metabolizer due to {', '.join(found)} (strong inhibitor).")
+        found = found_by.get("moderate_inhibitors")
+        if found and functional != "Poor Metabolizer":
+            functional = "Intermediate Metabolizer"
+            caused_by.extend(found)
+            log.append(f"{gene}: Genotype = {genotype}, adjusted to Intermediate Metabolizer due to {', '.join(found)} (moderate inhibitor).")
+        found_inducers = found_by.get("inducers")
         if found_inducers:
-            gene_state[gene]["functional"] = "Ultra-rapid Metabolizer"
-            gene_state[gene]["caused_by"].extend(found_inducers)
-            log.append(f"{gene}: Genotype = {gene_state[gene]['genotype']}, adjusted to Ultra-rapid Metabolizer due to {', '.join(found_inducers)} (inducer).")
-    # Reconstruct gene/phenotype pairs
-    for gene, info in gene_state.items():
-        functional_genes.append((gene, info["functional"]))
-    return functional_genes, gene_state
-
-from fpdf import FPDF
+            functional = "Ultra-rapid Metabolizer"
+            caused_by.extend(found_inducers)
+            log.append(f"{gene}: Genotype = {genotype}, adjusted to Ultra-rapid Metabolizer due to {', '.join(found_inducers)} (inducer).")
+        states.append((gene, genotype, functional, tuple(caused_by)))
+    return tuple(states), tuple(log)
 
 def clean_text(text):
-    return str(text).encode("latin-1", "replace").decode("latin-1")
+    text = str(text)
+    # Core PDF fonts are latin-1 only; plain ASCII (the common case) passes through
+    if text.isascii():
+        return text
+    return text.encode("latin-1", "replace").decode("latin-1")
 
 # Short-form for phenotypes
 phenotype_map = {
@@ -588,11 +241,16 @@ phenotype_map = {
 def short_pheno(pheno):
     return phenotype_map.get(pheno, pheno)
 
+def write_lines(pdf, lines):
+    """Writes one block per section: a single multi_cell, one entry per line."""
+    if lines:
+        pdf.multi_cell(0, 8, clean_text("\n".join(lines)), align='L', new_x="LMARGIN", new_y="NEXT")
+
+# Built eagerly by the panel so the download button works in one click; cached on
+# the report contents, so this runs once per distinct CDS result, not per rerun
+@st.cache_data(show_spinner=False)
 def create_pdf_report(
-    filename,
-    genes,
-    functional_genes,
-    gene_state,
+    gene_rows,
     active_meds,
     recommendations,
     polypharmacy_warnings,
@@ -600,75 +258,65 @@ def create_pdf_report(
     phenolog,
     smartnote_lines
 ):
+    # Imported here so fpdf is not loaded at app start-up, only once a CDS result is shown
+    from fpdf import FPDF
+
+    # Section titles, headers and the legend are ASCII literals and are written as-is;
+    # clean_text is only applied to report data
     pdf = FPDF()
     pdf.add_page()
-    pdf.set_font("Arial", size=12)
+    pdf.set_font("Helvetica", size=12)
 
-    pdf.cell(0, 10, clean_text("PGx-Guided Behavioral Health CDS Report"), ln=1, align='C')
-    pdf.set_font("Arial", style="I", size=9)
-    pdf.set_font("Arial", size=12)
+    pdf.cell(0, 10, "PGx-Guided Behavioral Health CDS Report", new_x="LMARGIN", new_y="NEXT", align='C')
 
     pdf.ln(5)
-    pdf.cell(0, 10, clean_text("Medications Assessed:"), ln=1)
-    for med in active_meds:
-        pdf.cell(0, 8, clean_text(f"- {med}"), ln=1)
+    pdf.cell(0, 10, "Medications Assessed:", new_x="LMARGIN", new_y="NEXT")
+    write_lines(pdf, [f"- {med}" for med in active_meds])
     pdf.ln(3)
 
     # --- Gene Metabolism Table ---
-    pdf.cell(0, 10, clean_text("Gene Metabolism Table:"), ln=1)
+    pdf.cell(0, 10, "Gene Metabolism Table:", new_x="LMARGIN", new_y="NEXT")
     pdf.set_font("Courier", size=8)
-    col_widths = [28, 18, 18, 70]  # Genotype and Functional cols are now tighter for short forms
-    headers = ["Gene", "Genotype", "Functional", "Caused by"]
-    for i, h in enumerate(headers):
-        pdf.cell(col_widths[i], 8, clean_text(h), border=1, align='C')
-    pdf.ln()
-    for gene in gene_state:
-        genotype = short_pheno(gene_state[gene]["genotype"])
-        func = short_pheno(gene_state[gene]["functional"])
-        caused_by = ", ".join(gene_state[gene]["caused_by"])
-        pdf.cell(col_widths[0], 8, clean_text(gene), border=1)
-        pdf.cell(col_widths[1], 8, clean_text(genotype), border=1)
-        pdf.cell(col_widths[2], 8, clean_text(func), border=1)
-        x, y = pdf.get_x(), pdf.get_y()
-        pdf.multi_cell(col_widths[3], 8, clean_text(caused_by), border=1)
-        pdf.set_xy(x + col_widths[3], y)
-        pdf.ln()
-    pdf.set_font("Arial", size=9, style="I")
+    col_widths = (28, 18, 22, 66)  # Genotype/Functional hold short forms; 22 fits the bold "Functional" heading
+    headers = ("Gene", "Genotype", "Functional", "Caused by")
+    # fpdf2 lays out the whole table in one pass and wraps long "Caused by" cells
+    with pdf.table(col_widths=col_widths, width=sum(col_widths), align="LEFT", line_height=8) as table:
+        table.row(headers)
+        for gene, genotype, functional, caused_by in gene_rows:
+            # Gene and phenotype names come from the ASCII panel tables; only med names need cleaning
+            table.row([gene, short_pheno(genotype), short_pheno(functional), clean_text(", ".join(caused_by))])
+    pdf.set_font("Helvetica", size=9, style="I")
     pdf.ln(2)
-    pdf.multi_cell(0, 8, clean_text(
+    pdf.multi_cell(0, 8,
     "Legend: NM = Normal Metabolizer, IM = Intermediate Metabolizer, UM = Ultra-rapid Metabolizer, "
     "PM = Poor Metabolizer, DF = Decreased Function, IR = Increased Risk, "
-    "Pos = Positive, Neg = Negative, NR = Not Reported"))
-    pdf.set_font("Arial", size=12)
+    "Pos = Positive, Neg = Negative, NR = Not Reported", new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font("Helvetica", size=12)
 
     # --- Recommendations & Risks ---
     pdf.ln(2)
-    pdf.cell(0, 10, clean_text("Recommendations & Risks:"), ln=1)
-    for _, rec_string, rec in recommendations:
-        pdf.multi_cell(0, 8, clean_text(f"{rec_string}: {rec}"), align='L')
+    pdf.cell(0, 10, "Recommendations & Risks:", new_x="LMARGIN", new_y="NEXT")
+    write_lines(pdf, [f"{rec_string}: {rec}" for _, rec_string, rec in recommendations])
 
     # --- Polypharmacy Warnings ---
     if polypharmacy_warnings:
-        pdf.cell(0, 10, clean_text("Polypharmacy Warnings:"), ln=1)
-        for warning in polypharmacy_warnings:
-            pdf.multi_cell(0, 8, clean_text(warning), align='L')
+        pdf.cell(0, 10, "Polypharmacy Warnings:", new_x="LMARGIN", new_y="NEXT")
+        write_lines(pdf, polypharmacy_warnings)
 
     # --- Flowsheet Prompts ---
-    pdf.cell(0, 10, clean_text("Flowsheet Prompts:"), ln=1)
-    for prompt in flowsheet_all:
-        pdf.multi_cell(0, 8, clean_text(prompt), align='L')
+    pdf.cell(0, 10, "Flowsheet Prompts:", new_x="LMARGIN", new_y="NEXT")
+    write_lines(pdf, flowsheet_all)
 
     # --- Phenoconversion Log ---
-    pdf.cell(0, 10, clean_text("Phenoconversion Log:"), ln=1)
-    for log in phenolog:
-        pdf.multi_cell(0, 8, clean_text(log), align='L')
+    pdf.cell(0, 10, "Phenoconversion Log:", new_x="LMARGIN", new_y="NEXT")
+    write_lines(pdf, phenolog)
 
     # --- Provider Smart Note ---
-    pdf.cell(0, 10, clean_text("Provider Smart Note:"), ln=1)
-    for line in smartnote_lines:
-        pdf.multi_cell(0, 8, clean_text(line), align='L')
+    pdf.cell(0, 10, "Provider Smart Note:", new_x="LMARGIN", new_y="NEXT")
+    write_lines(pdf, smartnote_lines)
 
-    pdf.output(filename)
+    # Build the document in memory; fpdf2 returns a bytearray
+    return bytes(pdf.output())
 
 # ----------------------- Streamlit UI -----------------------
 st.set_page_config(page_title="PGx CDS Dashboard", layout="wide")
@@ -692,17 +340,20 @@ with st.sidebar:
   
     if st.button("Clear All Medications"):
         st.session_state.selected_meds = []
-    
-    selected_meds = st.multiselect(
-        "Select Medications (type to search, select multiple):",
-        options=ALL_MEDS_DISPLAY,
-        key="selected_meds"
-    )
-    # <-- Put the symptom selector OUTSIDE the clear button logic! -->
-    symptom = st.selectbox(
-        "Observed Symptom",
-        ["None", "tremor", "agitation", "sedation", "QT prolongation", "toxicity", "orthostatic hypotension"]
-    )
+
+    # Med/symptom edits are applied together on submit instead of rerunning per change
+    with st.form("cds_inputs"):
+        selected_meds = st.multiselect(
+            "Select Medications (type to search, select multiple):",
+            options=ALL_MEDS_DISPLAY,
+            key="selected_meds"
+        )
+        # <-- Put the symptom selector OUTSIDE the clear button logic! -->
+        symptom = st.selectbox(
+            "Observed Symptom",
+            ["None", "tremor", "agitation", "sedation", "QT prolongation", "toxicity", "orthostatic hypotension"]
+        )
+        st.form_submit_button("Analyze")
 
     st.markdown("---")
     st.markdown("**Work in Process by Barry Ohearn, RN, MSN-Informatics Candidate (WGU, 2025).**")
@@ -711,80 +362,118 @@ with st.sidebar:
 st.markdown("# 🧬 PGx-Informed CDS Clinical Dashboard")
 st.markdown("#### A dynamic clinical tool for nurse/provider medication safety and personalized care.")
 
-if uploaded_file and selected_meds:
-    # Parse and process
-    if uploaded_file.type == "application/pdf":
-        raw_text = parse_pdf(uploaded_file)
-    else:
-        raw_text = uploaded_file.read().decode('utf-8')
-    genes = extract_genes_from_text(raw_text)
-
+# ----------------------- CDS Panel -----------------------
+# The CDS pipeline is cached per (report genes, med selection, symptom); it returns
+# plain tuples/dicts only, so results pickle safely across sessions and reruns.
+@st.cache_data(show_spinner=False)
+def compute_cds(genes, selected_meds, symptom):
     # Normalize selected meds for CDS logic
-    meds_mapped = {}
-    for disp in selected_meds:
-        generic = disp.split(' ')[0].lower()
-        meds_mapped[generic] = disp
+    meds_mapped = {
+        DISP_TO_GENERIC.get(disp) or disp.split(' ')[0].lower(): disp
+        for disp in selected_meds
+    }
     active_meds_norm = list(meds_mapped.keys())
     active_meds_disp = list(meds_mapped.values())
+    # Display name per active med, resolved once for all loops below
+    disp_of = {m: DISPLAY_NAME.get(m, m.capitalize()) for m in active_meds_norm}
 
     from collections import defaultdict
 
     # --- Class-based Polypharmacy Logic ---
+    # One pass: a class is flagged when its second med arrives; later meds extend the same list
     class_counter = defaultdict(list)
+    class_polypharmacy = {}
     for med in active_meds_norm:
         drug_class = DRUG_CLASSES.get(med)
         if drug_class:
-            class_counter[drug_class].append(med)
-
-    class_polypharmacy = {cls: meds for cls, meds in class_counter.items() if len(meds) > 1}
+            class_meds = class_counter[drug_class]
+            class_meds.append(med)
+            if len(class_meds) == 2:
+                class_polypharmacy[drug_class] = class_meds
 
     # ----- Phenoconversion -----
-    phenolog = []
-    functional_genes, gene_state = phenoconvert_genes(genes, active_meds_norm, phenolog)
+    gene_rows, phenolog = _phenoconvert(tuple(genes), tuple(active_meds_norm))
+    functional_genes = [(gene, functional) for gene, _, functional, _ in gene_rows]
 
     # Metrics
-    high_risk_count = 0
     polypharmacy_count = 0
     recommendations = []
+    # Display buckets, split on the same 0.2 threshold the panel highlights
+    high_risk_recs = []
+    low_risk_recs = []
     smartnote_lines = []
     polypharmacy_warnings = []
-    gene_med_tracker = {}
+    # Each (gene, phenotype, med) rule is visited once, so plain lists stay unique
+    gene_med_tracker = defaultdict(list)
+    flowsheet_all = set()
 
     # ----- CDS Logic -----
-    shown_recs = set()
-    for gene, phenotype in functional_genes:
-        for med in active_meds_norm:
-            key = (gene, phenotype, med)
-            rec_string = f"{gene} ({phenotype}) + {DISPLAY_NAME.get(med, med.capitalize())}"
-            if key in PGX_FACTORS and rec_string not in shown_recs:
-                prior_risk = PRIOR_RISKS.get(med, 0.05)
-                pgx_factor = PGX_FACTORS.get(key, 1)
-                symptom_factor = 2 if symptom in ["tremor", "agitation", "QT prolongation", "toxicity", "orthostatic hypotension"] else 1
-                risk = min(prior_risk * pgx_factor * symptom_factor, 1.0)
-                comment = CLINICAL_COMMENTS.get(key, "")
-                rec = f"Estimated risk: {int(risk*100)}%. [{gene} metabolism: {phenotype}]. {comment}"
-                smartnote_lines.append(f"- {rec_string}: {rec}")
-                shown_recs.add(rec_string)
-                # Polypharmacy
-                enzyme = (gene, phenotype)
-                gene_med_tracker.setdefault(enzyme, set()).add(med)
-                # For metrics
-                if risk > 0.2:
-                    high_risk_count += 1
-                recommendations.append((risk, rec_string, rec))
+    symptom_factor = 2 if symptom in HIGH_RISK_SYMPTOMS else 1
+    # Rules matching the patient's functional phenotypes, built once per phenotype
+    # set; each active med is then a single lookup (genes and meds are unique here).
+    patient_rules = _patient_rule_table(tuple(functional_genes))
+    for med in active_meds_norm:
+        for gene, phenotype, base_risk, prompts, comment in patient_rules.get(med, ()):
+            rec_string = f"{gene} ({phenotype}) + {disp_of[med]}"
+            risk = min(base_risk * symptom_factor, 1.0)
+            rec = f"Estimated risk: {int(risk*100)}%. [{gene} metabolism: {phenotype}]. {comment}"
+            smartnote_lines.append(f"- {rec_string}: {rec}")
+            # Polypharmacy
+            enzyme = (gene, phenotype)
+            gene_med_tracker[enzyme].append(med)
+            recommendations.append((risk, rec_string, rec))
+            (high_risk_recs if risk > 0.2 else low_risk_recs).append((risk, rec_string, rec))
+            # Flowsheet prompts come from the same matched rule
+            for prompt in prompts:
+                flowsheet_all.add(f"{disp_of[med]}: {prompt}")
 
     for enzyme, meds in gene_med_tracker.items():
-        meds_set = list(set(meds))
-        if len(meds_set) > 1:
-            polypharmacy_count += 1
-            polypharmacy_warnings.append(
-                f"⚠️ Polypharmacy alert: {', '.join([DISPLAY_NAME.get(m, m.capitalize()) for m in meds_set])} all metabolized by {enzyme[0]}. ↑ risk of drug-drug interaction and toxicity."
-            )
+        if len(meds) < 2:
+            continue
+        polypharmacy_count += 1
+        polypharmacy_warnings.append(
+            f"⚠️ Polypharmacy alert: {', '.join([disp_of[m] for m in meds])} all metabolized by {enzyme[0]}. ↑ risk of drug-drug interaction and toxicity."
+        )
+
+    # Highest risk first within each bucket; done once here, not on every render
+    high_risk_recs.sort(key=lambda x: -x[0])
+    low_risk_recs.sort(key=lambda x: -x[0])
+
+    return {
+        "active_meds_disp": active_meds_disp,
+        "disp_of": disp_of,
+        "class_polypharmacy": class_polypharmacy,
+        "gene_rows": gene_rows,
+        "phenolog": list(phenolog),
+        "recommendations": recommendations,
+        "high_risk_recs": high_risk_recs,
+        "low_risk_recs": low_risk_recs,
+        "smartnote_lines": smartnote_lines,
+        "polypharmacy_warnings": polypharmacy_warnings,
+        "flowsheet_all": flowsheet_all,
+        "high_risk_count": len(high_risk_recs),
+        "polypharmacy_count": polypharmacy_count,
+    }
+
+# Runs as a fragment so in-panel interactions (e.g. the PDF export buttons)
+# rerun only this panel instead of the whole script.
+@st.fragment
+def render_cds(genes, selected_meds, symptom):
+    cds = compute_cds(genes, selected_meds, symptom)
+    active_meds_disp = cds["active_meds_disp"]
+    disp_of = cds["disp_of"]
+    class_polypharmacy = cds["class_polypharmacy"]
+    gene_rows = cds["gene_rows"]
+    phenolog = cds["phenolog"]
+    recommendations = cds["recommendations"]
+    smartnote_lines = cds["smartnote_lines"]
+    polypharmacy_warnings = cds["polypharmacy_warnings"]
+    flowsheet_all = cds["flowsheet_all"]
 
     # ----- Dashboard Metrics -----
     colA, colB, colC = st.columns(3)
-    colA.metric("🔴 High-Risk Findings", high_risk_count)
-    colB.metric("🟡 Polypharmacy Alerts", polypharmacy_count)
+    colA.metric("🔴 High-Risk Findings", cds["high_risk_count"])
+    colB.metric("🟡 Polypharmacy Alerts", cds["polypharmacy_count"])
     colC.metric("🧬 Markers Detected", len(set(genes)))
 
     st.markdown("---")
@@ -795,14 +484,14 @@ if uploaded_file and selected_meds:
     with left_col:
         st.subheader("🧬 Gene Metabolism Table")
         if genes:
-            df = pd.DataFrame([
-                {
-                    "Gene": gene,
-                    "Genotype Phenotype": gene_state[gene]["genotype"],
-                    "Functional Phenotype": gene_state[gene]["functional"],
-                    "Caused by Drugs": ", ".join(gene_state[gene]["caused_by"])
-                } for gene in gene_state
-            ])
+            rows = [
+                (gene, genotype, functional, ", ".join(caused_by))
+                for gene, genotype, functional, caused_by in gene_rows
+            ]
+            df = pd.DataFrame.from_records(
+                rows,
+                columns=["Gene", "Genotype Phenotype", "Functional Phenotype", "Caused by Drugs"]
+            )
             st.dataframe(df, hide_index=True)
         else:
             st.info("No recognized gene/phenotype pairs found.")
@@ -813,13 +502,12 @@ if uploaded_file and selected_meds:
     with right_col:
         st.subheader("🔎 Recommendations & Risks")
         if recommendations:
-            for risk, rec_string, rec in sorted(recommendations, key=lambda x: -x[0]):
-                if risk > 0.2:
-                    st.error(f"⚠️ {rec_string}:")
-                    st.markdown(rec, unsafe_allow_html=True)
-                else:
-                    st.info(f"{rec_string}:")
-                    st.markdown(rec, unsafe_allow_html=True)
+            for _, rec_string, rec in cds["high_risk_recs"]:
+                st.error(f"⚠️ {rec_string}:")
+                st.markdown(rec, unsafe_allow_html=True)
+            for _, rec_string, rec in cds["low_risk_recs"]:
+                st.info(f"{rec_string}:")
+                st.markdown(rec, unsafe_allow_html=True)
         else:
             st.info("No specific recommendations based on current rules.")
         if polypharmacy_warnings:
@@ -829,19 +517,13 @@ if uploaded_file and selected_meds:
         # --- Class-based polypharmacy alerts ---
         if class_polypharmacy:
             for cls, meds in class_polypharmacy.items():
-                med_names = [DISPLAY_NAME.get(m, m.capitalize()) for m in meds]
+                med_names = [disp_of[m] for m in meds]
                 st.warning(
                     f"⚠️ Multiple {cls}s selected: {', '.join(med_names)}. "
                     "Increased risk of additive side effects, interactions, and toxicity. "
                     "Review the combination carefully."
             )        
         with st.expander("📋 Dynamic Flowsheet Prompts"):
-            flowsheet_all = set()
-            for gene, phenotype in functional_genes:
-                for med in active_meds_norm:
-                    prompts = FLOWSHEET_PROMPTS.get((gene, phenotype, med), [])
-                    for prompt in prompts:
-                        flowsheet_all.add(f"{DISPLAY_NAME.get(med, med.capitalize())}: {prompt}")
             if flowsheet_all:
                 for prompt in sorted(flowsheet_all):
                     st.write(f"- {prompt}")
@@ -863,20 +545,16 @@ if uploaded_file and selected_meds:
         st.info("No CDS findings to summarize.")
 
     # ----- PDF Export -----
-    if st.button("Download PDF Summary Report"):
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_pdf:
-            create_pdf_report(
-                tmp_pdf.name,
-                genes, functional_genes, gene_state, active_meds_disp,
-                recommendations, polypharmacy_warnings, flowsheet_all, phenolog, smartnote_lines
-            )
-            with open(tmp_pdf.name, "rb") as f:
-                st.download_button(
-                    label="Click to Download PDF",
-                    data=f,
-                    file_name="PGx_CDS_Report.pdf",
-                    mime="application/pdf"
-                )
+    pdf_bytes = create_pdf_report(
+        gene_rows, active_meds_disp,
+        recommendations, polypharmacy_warnings, flowsheet_all, phenolog, smartnote_lines
+    )
+    st.download_button(
+        label="Download PDF Summary Report",
+        data=pdf_bytes,
+        file_name="PGx_CDS_Report.pdf",
+        mime="application/pdf"
+    )
 
     # ----- CDS Logic JSON -----
     with st.expander("Show CDS Logic Snapshot (JSON)"):
@@ -890,6 +568,17 @@ if uploaded_file and selected_meds:
             "phenoconversion_log": phenolog
         })
 
+if uploaded_file and selected_meds:
+    # Parse and process (cached on the uploaded bytes, so reruns skip the parse)
+    file_bytes = uploaded_file.getvalue()
+    if uploaded_file.type == "application/pdf":
+        raw_text = _parse_pdf_cached(file_bytes)
+    else:
+        raw_text = file_bytes.decode('utf-8')
+    genes = _extract_genes_cached(raw_text)
+
+    render_cds(genes, selected_meds, symptom)
+
 else:
     st.info("Upload a PGx result and enter one or more active medications to begin.")
 
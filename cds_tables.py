@@ -0,0 +1,479 @@
+"""
+Reference tables for the PGx CDS dashboard: brand/generic synonyms, drug
+classes, phenoconversion agents, and the gene-drug rules (risk factors,
+flowsheet prompts, clinical comments, prior risks).
+
+These live in their own module so Streamlit imports them once per process;
+dict literals in the main script would be rebuilt on every rerun.
+"""
+
+import functools
+import sys
+
+# ----------------------- Brand/Generic Synonym Mapping -----------------------
+# Add new pairs as needed
+BRAND_TO_GENERIC = {
+    # SSRIs / SNRIs
+    "lexapro": "escitalopram",
+    "celexa": "citalopram",
+    "paxil": "paroxetine",
+    "prozac": "fluoxetine",
+    "zoloft": "sertraline",
+    "effexor": "venlafaxine",
+    "cymbalta": "duloxetine",
+    # Antipsychotics
+    "abilify": "aripiprazole",
+    "risperdal": "risperidone",
+    "zyprexa": "olanzapine",
+    "seroquel": "quetiapine",
+    "geodon": "ziprasidone",
+    "haldol": "haloperidol",
+    # Mood stabilizers
+    "lamictal": "lamotrigine",
+    "tegretol": "carbamazepine",
+    "depakote": "valproate",
+    # Other psych
+    "wellbutrin": "bupropion",
+    "ativan": "lorazepam",
+    "klonopin": "clonazepam",
+    "ambien": "zolpidem",
+    "buspar": "buspirone"
+}
+# Include reverse mappings (generic -> itself)
+MED_SYNONYMS = {**BRAND_TO_GENERIC, **{generic: generic for generic in BRAND_TO_GENERIC.values()}}
+
+# For display: brand/generic pretty mapping
+DISPLAY_NAME = {
+    "escitalopram": "escitalopram (Lexapro)",
+    "citalopram": "citalopram (Celexa)",
+    "paroxetine": "paroxetine (Paxil)",
+    "fluoxetine": "fluoxetine (Prozac)",
+    "sertraline": "sertraline (Zoloft)",
+    "venlafaxine": "venlafaxine (Effexor)",
+    "duloxetine": "duloxetine (Cymbalta)",
+    "aripiprazole": "aripiprazole (Abilify)",
+    "risperidone": "risperidone (Risperdal)",
+    "olanzapine": "olanzapine (Zyprexa)",
+    "quetiapine": "quetiapine (Seroquel)",
+    "ziprasidone": "ziprasidone (Geodon)",
+    "haloperidol": "haloperidol (Haldol)",
+    "lamotrigine": "lamotrigine (Lamictal)",
+    "carbamazepine": "carbamazepine (Tegretol)",
+    "valproate": "valproate (Depakote)",
+    "bupropion": "bupropion (Wellbutrin)",
+    "lorazepam": "lorazepam (Ativan)",
+    "clonazepam": "clonazepam (Klonopin)",
+    "zolpidem": "zolpidem (Ambien)",
+    "buspirone": "buspirone (Buspar)",
+}
+# Reverse lookup: dropdown display string -> generic
+DISP_TO_GENERIC = {disp: generic for generic, disp in DISPLAY_NAME.items()}
+# Any known brand/generic name -> (generic, display), so normalizing is one probe
+NORM = {}
+for _name in (*MED_SYNONYMS, *DISPLAY_NAME):
+    _generic = MED_SYNONYMS.get(_name, _name)
+    NORM[_name] = (_generic, DISPLAY_NAME.get(_generic, _generic.capitalize()))
+@functools.lru_cache(maxsize=512)
+def normalize_med_name(med):
+    """Returns canonical generic med name, and display string with brand."""
+    key = med.strip().lower()
+    return NORM.get(key) or (key, key.capitalize())
+# ---- Combined list of all unique med names for autocomplete ----
+ALL_MEDS = sorted({*MED_SYNONYMS.keys(), *MED_SYNONYMS.values()})
+# Show both brand and generic in dropdown options (dict.fromkeys dedups, keeping order)
+ALL_MEDS_DISPLAY = tuple(dict.fromkeys(normalize_med_name(med)[1] for med in ALL_MEDS))
+# ----------------------- Drug Class Mapping -----------------------
+DRUG_CLASSES = {
+    # Antipsychotics
+    "aripiprazole": "Antipsychotic",
+    "risperidone": "Antipsychotic",
+    "olanzapine": "Antipsychotic",
+    "quetiapine": "Antipsychotic",
+    "ziprasidone": "Antipsychotic",
+    "haloperidol": "Antipsychotic",
+    # SSRIs
+    "escitalopram": "SSRI",
+    "citalopram": "SSRI",
+    "paroxetine": "SSRI",
+    "fluoxetine": "SSRI",
+    "sertraline": "SSRI",
+    # SNRIs
+    "venlafaxine": "SNRI",
+    "duloxetine": "SNRI",
+    # Mood stabilizers
+    "lamotrigine": "Mood stabilizer",
+    "carbamazepine": "Mood stabilizer",
+    "valproate": "Mood stabilizer",
+    # Anxiolytics/Sedatives
+    "clonazepam": "Benzodiazepine",
+    "lorazepam": "Benzodiazepine",
+    "zolpidem": "Sedative/Hypnotic",
+    "buspirone": "Anxiolytic",
+    # Add others as needed
+}
+# ----------------------- Phenoconversion Inhibitors/Inducers -----------------------
+PHENOCONVERT = {
+    "CYP2D6": {
+        "strong_inhibitors": ["paroxetine", "fluoxetine", "bupropion"],
+        "moderate_inhibitors": [],
+        "inducers": []
+    },
+    "CYP2C19": {
+        "strong_inhibitors": ["fluvoxamine", "fluoxetine"],
+        "moderate_inhibitors": [],
+        "inducers": ["carbamazepine"]
+    },
+    "CYP3A4": {
+        "strong_inhibitors": ["ritonavir", "ketoconazole"],
+        "moderate_inhibitors": ["fluvoxamine"],
+        "inducers": ["carbamazepine"]
+    },
+    "CYP1A2": {
+        "strong_inhibitors": ["fluvoxamine"],
+        "moderate_inhibitors": [],
+        "inducers": ["carbamazepine", "smoking"]
+    }
+}
+# Reverse index for the active-med scan: med -> [(gene, role), ...]
+# (PHENOCONVERT is only read here, so its agent lists need no set conversion)
+MED_EFFECTS = {}
+for _gene, _roles in PHENOCONVERT.items():
+    for _role, _agents in _roles.items():
+        for _med in _agents:
+            MED_EFFECTS.setdefault(_med, []).append((_gene, _role))
+
+# --------------- Example PGX_FACTORS, FLOWSHEET_PROMPTS, CLINICAL_COMMENTS, PRIOR_RISKS ---------------
+# Use your latest/expanded dictionaries here (truncated for brevity in this sample)
+PGX_FACTORS = {
+    # --- Antipsychotics ---
+    ("CYP2D6", "Poor Metabolizer", "risperidone"): 3,
+    ("CYP2D6", "Poor Metabolizer", "aripiprazole"): 2.5,
+    ("CYP2D6", "Poor Metabolizer", "haloperidol"): 2.5,
+    ("CYP3A4", "Decreased Function", "quetiapine"): 2,
+    ("CYP1A2", "Ultra-rapid Metabolizer", "olanzapine"): 0.5,
+    ("CYP1A2", "Ultra-rapid Metabolizer", "clozapine"): 0.5,
+    ("CYP3A5", "Poor Metabolizer", "quetiapine"): 0.5,
+    ("CYP3A5", "Intermediate Metabolizer", "quetiapine"): 0.8,
+    
+    # --- SSRIs/SNRIs ---
+    ("CYP2C19", "Ultra-rapid Metabolizer", "citalopram"): 0.4,
+    ("CYP2C19", "Poor Metabolizer", "citalopram"): 2,
+    ("CYP2C19", "Ultra-rapid Metabolizer", "escitalopram"): 0.5,
+    ("CYP2C19", "Poor Metabolizer", "escitalopram"): 1.8,
+    ("CYP2D6", "Poor Metabolizer", "paroxetine"): 2,
+    ("CYP2D6", "Poor Metabolizer", "fluoxetine"): 1.5,
+    ("CYP2D6", "Poor Metabolizer", "venlafaxine"): 2,
+    ("CYP2D6", "Poor Metabolizer", "duloxetine"): 1.5,
+
+    # --- Mood stabilizers ---
+    ("CYP2C19", "Poor Metabolizer", "lamotrigine"): 1.2,
+    ("CYP2C9", "Poor Metabolizer", "valproate"): 1.4,
+    ("CYP2C9", "Poor Metabolizer", "phenytoin"): 2.2,
+    ("CYP2C9", "Intermediate Metabolizer", "phenytoin"): 1.4,
+    ("UGT1A4", "Poor Metabolizer", "lamotrigine"): 1.3,
+    ("HLA-A*31:01", "Positive", "carbamazepine"): 5,  # strong contraindication
+    ("HLA-A*31:01", "Positive", "oxcarbazepine"): 5,
+    ("HLA-B*15:02", "Positive", "carbamazepine"): 5,  # strong contraindication
+    ("HLA-B*15:02", "Positive", "oxcarbazepine"): 5,
+    
+    # --- Anxiolytics/Sleep ---
+    ("CYP3A4", "Decreased Function", "alprazolam"): 1.7,
+    ("CYP2C19", "Poor Metabolizer", "diazepam"): 1.6,
+    ("CYP3A4", "Decreased Function", "zolpidem"): 1.5,
+    ("UGT2B15", "Poor Metabolizer", "lorazepam"): 2.2,
+    ("UGT2B15", "Poor Metabolizer", "oxazepam"): 2.2,
+    
+    # --- Pharmacodynamic/Transporters/Other ---
+    ("HTR2A", "A/A", "sertraline"): 0.7,
+    ("SLC6A4", "S/S", "sertraline"): 0.7,
+    ("COMT", "Val/Val", "bupropion"): 0.8,
+    ("CYP2B6", "Poor Metabolizer", "bupropion"): 2,
+    ("CYP2B6", "Intermediate Metabolizer", "bupropion"): 1.2,
+    ("MTHFR", "C/T", "any"): 0.2,  # placeholder
+    ("MTHFR", "A/C", "any"): 0.2,
+}
+FLOWSHEET_PROMPTS = {
+    # --- Antipsychotics ---
+    ("CYP2D6", "Poor Metabolizer", "risperidone"): ("Monitor for tremor", "Assess for EPS", "Check for sedation"),
+    ("CYP2D6", "Poor Metabolizer", "aripiprazole"): ("Monitor for akathisia", "Check for restlessness"),
+    ("CYP2D6", "Poor Metabolizer", "haloperidol"): ("Assess for rigidity", "Monitor for neurotoxicity"),
+    ("CYP3A4", "Decreased Function", "quetiapine"): ("Check for sedation", "Monitor blood pressure (orthostasis)"),
+    ("CYP1A2", "Ultra-rapid Metabolizer", "olanzapine"): ("Assess for decreased efficacy", "Monitor weight/appetite"),
+
+    # --- SSRIs/SNRIs ---
+    ("CYP2C19", "Ultra-rapid Metabolizer", "citalopram"): ("Assess for lack of effect", "Monitor mood symptoms"),
+    ("CYP2C19", "Poor Metabolizer", "citalopram"): ("Monitor for QT prolongation", "Check for GI upset"),
+    ("CYP2D6", "Poor Metabolizer", "paroxetine"): ("Assess for anticholinergic effects", "Monitor for sedation"),
+    ("CYP2D6", "Poor Metabolizer", "fluoxetine"): ("Check for insomnia", "Monitor for GI side effects"),
+
+    # --- Mood stabilizers ---
+    ("CYP2C19", "Poor Metabolizer", "lamotrigine"): ("Monitor for rash", "Assess for dizziness"),
+
+    # --- Anxiolytics/Sleep ---
+    ("CYP3A4", "Decreased Function", "alprazolam"): ("Monitor for sedation", "Assess fall risk"),
+    ("CYP2C19", "Poor Metabolizer", "diazepam"): ("Check for prolonged sedation", "Assess confusion"),
+    ("CYP3A4", "Decreased Function", "zolpidem"): ("Monitor for next-day drowsiness",),
+
+    # --- Pharmacodynamic/Transporters ---
+    ("HTR2A", "A/A", "sertraline"): ("Monitor for lack of SSRI effect",),
+    ("SLC6A4", "S/S", "sertraline"): ("Assess for SSRI intolerance",),
+    ("COMT", "Val/Val", "bupropion"): ("Monitor for low response", "Check for irritability"),
+
+    # --- Expanded Tempus Panel Genes ---
+
+    # CYP2B6 - relevant for bupropion
+    ("CYP2B6", "Poor Metabolizer", "bupropion"): ("Monitor for agitation or insomnia", "Assess for bupropion toxicity (e.g., seizures)"),
+    ("CYP2B6", "Intermediate Metabolizer", "bupropion"): ("Monitor for bupropion side effects","Assess efficacy at usual dose"),
+
+    # CYP2C9 - impacts phenytoin/valproate
+    ("CYP2C9", "Poor Metabolizer", "phenytoin"): ("Monitor phenytoin levels closely","Assess for ataxia or nystagmus"),
+    ("CYP2C9", "Poor Metabolizer", "valproate"): ("Monitor LFTs","Check for GI side effects"),
+
+    # CYP3A5 - less common, but can impact clearance
+    ("CYP3A5", "Poor Metabolizer", "quetiapine"): ("Monitor for sedation","Assess for excessive drowsiness"),
+    ("CYP3A5", "Intermediate Metabolizer", "quetiapine"): ("Monitor for quetiapine side effects","Check for dizziness"),
+
+    # UGT1A4 - impacts lamotrigine
+    ("UGT1A4", "Poor Metabolizer", "lamotrigine"): ("Monitor for increased lamotrigine side effects","Assess for dizziness or diplopia"),
+
+    # UGT2B15 - impacts lorazepam, oxazepam
+    ("UGT2B15", "Poor Metabolizer", "lorazepam"): ("Monitor for excessive sedation","Assess for respiratory depression"),
+    ("UGT2B15", "Poor Metabolizer", "oxazepam"): ("Monitor for prolonged sedation","Check for confusion"),
+
+    # HLA-A*31:01 - SJS/TEN risk
+    ("HLA-A*31:01", "Positive", "carbamazepine"): ("Do NOT administer—risk of severe skin reaction (SJS/TEN)","Alert provider immediately"),
+    ("HLA-A*31:01", "Positive", "oxcarbazepine"): ("Do NOT administer—risk of severe skin reaction (SJS/TEN)","Alert provider immediately"),
+
+    # HLA-B*15:02 - SJS/TEN risk
+    ("HLA-B*15:02", "Positive", "carbamazepine"): ("Do NOT administer—risk of Stevens-Johnson Syndrome","Alert provider immediately"),
+    ("HLA-B*15:02", "Positive", "oxcarbazepine"): ("Do NOT administer—risk of Stevens-Johnson Syndrome","Alert provider immediately"),
+
+    # MTHFR - not directly actionable, but can document
+    ("MTHFR", "C/T", "any"): ("Document folate metabolism variant","Consider folate supplementation if clinically indicated"),
+    ("MTHFR", "A/C", "any"): ("Document folate metabolism variant","Monitor for neuropsychiatric symptoms if relevant"),
+
+}
+
+CLINICAL_COMMENTS = {
+    # --- Antipsychotics ---
+    ("CYP2D6", "Poor Metabolizer", "risperidone"):
+        "CYP2D6 Poor Metabolizer status reduces risperidone clearance, causing the drug to accumulate in the bloodstream. "
+        "This increases the risk of extrapyramidal side effects (EPS), sedation, and toxicity. "
+        "Consider lowering the dose or switching to a medication less dependent on CYP2D6 metabolism. "
+        "[CPIC Guideline](https://cpicpgx.org/guidelines/) | [PharmGKB Risperidone](https://www.pharmgkb.org/chemical/PA451257).",
+
+    ("CYP2D6", "Poor Metabolizer", "aripiprazole"):
+        "Poor CYP2D6 metabolism slows aripiprazole clearance, raising blood concentrations and increasing risk of side effects such as akathisia, sedation, and QT prolongation. "
+        "A dose reduction or alternative therapy may be appropriate. "
+        "[CPIC Guideline](https://cpicpgx.org/guidelines/) | [PharmGKB Aripiprazole](https://www.pharmgkb.org/chemical/PA10026).",
+
+    ("CYP2D6", "Poor Metabolizer", "haloperidol"):
+        "Reduced CYP2D6 function decreases haloperidol metabolism, which can lead to higher blood levels and increased risk of EPS, neurotoxicity, or cardiac adverse events. Careful monitoring or dose adjustment is recommended. "
+        "[CPIC Guideline](https://cpicpgx.org/guidelines/) | [PharmGKB Haloperidol](https://www.pharmgkb.org/chemical/PA449841).",
+
+    ("CYP3A4", "Decreased Function", "quetiapine"):
+        "Quetiapine is primarily metabolized by CYP3A4. Decreased function can lead to elevated quetiapine concentrations, increasing sedation, orthostatic hypotension, and risk of toxicity. Dose reduction may be needed. "
+        "[CPIC Guideline](https://cpicpgx.org/guidelines/) | [PharmGKB Quetiapine](https://www.pharmgkb.org/chemical/PA451201).",
+
+    ("CYP1A2", "Ultra-rapid Metabolizer", "olanzapine"):
+        "Ultra-rapid CYP1A2 metabolism increases olanzapine clearance, potentially resulting in subtherapeutic levels and decreased efficacy, especially in smokers. Consider higher doses or alternate agents. "
+        "[CPIC Guideline](https://cpicpgx.org/guidelines/) | [PharmGKB Olanzapine](https://www.pharmgkb.org/chemical/PA450688).",
+
+    ("CYP1A2", "Ultra-rapid Metabolizer", "clozapine"):
+        "Ultra-rapid metabolism leads to low clozapine levels, risking therapeutic failure. Monitor response and consider dose adjustment. "
+        "[CPIC Guideline](https://cpicpgx.org/guidelines/) | [PharmGKB Clozapine](https://www.pharmgkb.org/chemical/PA449061).",
+    
+    ("CYP3A4", "Decreased Function", "ziprasidone"):
+        "Ziprasidone is primarily metabolized by CYP3A4, but there are currently no actionable pharmacogenomic recommendations. Standard care applies. "
+        "[PharmGKB Ziprasidone](https://www.pharmgkb.org/chemical/PA451974).",
+
+    # --- SSRIs/SNRIs ---
+    ("CYP2C19", "Ultra-rapid Metabolizer", "citalopram"):
+        "CYP2C19 ultra-rapid metabolism clears citalopram more quickly, which can result in subtherapeutic plasma concentrations and poor antidepressant response. "
+        "Consider an SSRI less affected by CYP2C19 or increase the dose if clinically appropriate. "
+        "[CPIC Guideline](https://cpicpgx.org/guidelines/cpic-guideline-for-ssri-and-snri-antidepressants/) | [PharmGKB Citalopram](https://www.pharmgkb.org/chemical/PA449015).",
+
+    ("CYP2C19", "Poor Metabolizer", "citalopram"):
+        "Poor CYP2C19 metabolism raises citalopram levels, increasing the risk of QT prolongation and other side effects. Dose reduction or close monitoring is recommended. "
+        "[CPIC Guideline](https://cpicpgx.org/guidelines/cpic-guideline-for-ssri-and-snri-antidepressants/) | [PharmGKB Citalopram](https://www.pharmgkb.org/chemical/PA449015).",
+
+    ("CYP2C19", "Ultra-rapid Metabolizer", "escitalopram"):
+        "Faster metabolism of escitalopram may cause lower drug levels and reduced antidepressant effect. Monitor for lack of response. "
+        "[CPIC Guideline](https://cpicpgx.org/guidelines/cpic-guideline-for-ssri-and-snri-antidepressants/) | [PharmGKB Escitalopram](https://www.pharmgkb.org/chemical/PA10074).",
+
+    ("CYP2C19", "Poor Metabolizer", "escitalopram"):
+        "Reduced metabolism raises escitalopram blood levels, increasing the risk of side effects, including QT prolongation. Consider lower doses or more frequent monitoring. "
+        "[CPIC Guideline](https://cpicpgx.org/guidelines/cpic-guideline-for-ssri-and-snri-antidepressants/) | [PharmGKB Escitalopram](https://www.pharmgkb.org/chemical/PA10074).",
+
+    ("CYP2D6", "Poor Metabolizer", "paroxetine"):
+        "CYP2D6 Poor Metabolizer status leads to slow paroxetine clearance, resulting in drug accumulation and a higher risk of anticholinergic effects, sedation, and sexual dysfunction. Dose reduction or switching medications may be needed. "
+        "[CPIC Guideline](https://cpicpgx.org/guidelines/cpic-guideline-for-ssri-and-snri-antidepressants/) | [PharmGKB Paroxetine](https://www.pharmgkb.org/chemical/PA450801).",
+
+    ("CYP2D6", "Poor Metabolizer", "fluoxetine"):
+        "Reduced CYP2D6 activity increases fluoxetine levels, elevating risk of side effects such as insomnia, GI upset, and serotonin syndrome. Monitor and consider dose reduction. "
+        "[CPIC Guideline](https://cpicpgx.org/guidelines/cpic-guideline-for-ssri-and-snri-antidepressants/) | [PharmGKB Fluoxetine](https://www.pharmgkb.org/chemical/PA449673).",
+
+    ("CYP2D6", "Poor Metabolizer", "venlafaxine"):
+        "Venlafaxine is metabolized to its active metabolite by CYP2D6. Poor metabolism may cause higher venlafaxine and lower active metabolite levels, leading to reduced efficacy and increased side effects. Adjust therapy as needed. "
+        "[CPIC Guideline](https://cpicpgx.org/guidelines/cpic-guideline-for-ssri-and-snri-antidepressants/) | [PharmGKB Venlafaxine](https://www.pharmgkb.org/chemical/PA451866).",
+
+    ("CYP2D6", "Poor Metabolizer", "duloxetine"):
+        "Slow CYP2D6 metabolism raises duloxetine concentrations, increasing the risk of side effects such as nausea, hypertension, and liver toxicity. Lower doses or alternative therapy may be appropriate. "
+        "[CPIC Guideline](https://cpicpgx.org/guidelines/cpic-guideline-for-ssri-and-snri-antidepressants/) | [PharmGKB Duloxetine](https://www.pharmgkb.org/chemical/PA10066).",
+
+    # --- Mood Stabilizers/Other Psych ---
+     ("CYP2C19", "Poor Metabolizer", "lamotrigine"):
+        "Poor CYP2C19 metabolism may result in higher lamotrigine levels, which can increase the risk of rash and other adverse effects. Monitor closely. "
+        "[PharmGKB Lamotrigine](https://www.pharmgkb.org/chemical/PA450164).",
+
+    ("CYP2C19", "Ultra-rapid Metabolizer", "clobazam"):
+        "Faster metabolism may result in lower clobazam levels, possibly reducing efficacy in seizure control or anxiety treatment. "
+        "[PharmGKB Clobazam](https://www.pharmgkb.org/chemical/PA10888).",
+
+    # --- Anxiety/Sleep ---
+    ("CYP3A4", "Decreased Function", "alprazolam"):
+        "Decreased CYP3A4 activity leads to slower alprazolam metabolism, increasing sedation, confusion, and fall risk, especially in older adults. "
+        "[PharmGKB Alprazolam](https://www.pharmgkb.org/chemical/PA448333).",
+
+    ("CYP2C19", "Poor Metabolizer", "diazepam"):
+        "Poor metabolism of diazepam leads to drug accumulation, prolonging sedation and increasing risk of adverse effects. "
+        "[CPIC Guideline](https://cpicpgx.org/guidelines/) | [PharmGKB Diazepam](https://www.pharmgkb.org/chemical/PA449283).",
+
+    ("CYP3A4", "Decreased Function", "zolpidem"):
+        "Zolpidem is cleared by CYP3A4. Decreased function can result in prolonged sedation and next-day drowsiness. Lower doses or alternate sleep aids may be needed. "
+        "[PharmGKB Zolpidem](https://www.pharmgkb.org/chemical/PA451976).",
+    ("CYP2D6", "Poor Metabolizer", "buspirone"):
+        "Buspirone: No clinically significant pharmacogenomic drug-gene interactions have been established. Standard dosing and monitoring apply. "
+        "[PharmGKB Buspirone](https://www.pharmgkb.org/chemical/PA448689).",
+    ("CYP3A4", "Decreased Function", "buspirone"):
+        "Buspirone: While metabolized by CYP3A4, no actionable gene-drug interactions are established in clinical guidelines. "
+        "[PharmGKB Buspirone](https://www.pharmgkb.org/chemical/PA448689).",
+    ("CYP3A4", "Decreased Function", "clonazepam"):
+        "Clonazepam: CYP3A4 plays a role in metabolism, but no clinically actionable PGx recommendations are currently available. "
+        "[PharmGKB Clonazepam](https://www.pharmgkb.org/chemical/PA449050).",
+
+    ("UGT1A4", "Poor Metabolizer", "clonazepam"):
+        "Clonazepam: Glucuronidation is the major metabolic pathway, but current evidence does not support actionable pharmacogenomic guidance. "
+        "[PharmGKB Clonazepam](https://www.pharmgkb.org/chemical/PA449050).",
+
+    ("UGT2B7", "Poor Metabolizer", "lorazepam"):
+        "Lorazepam is metabolized by glucuronidation (UGT2B7). No clinically significant pharmacogenomic effects have been reported. Use standard dosing and monitoring. "
+        "[PharmGKB Lorazepam](https://www.pharmgkb.org/chemical/PA450267).",
+    # --- Transporter/Pharmacodynamic Markers ---
+    ("HTR2A", "A/A", "sertraline"):
+        "HTR2A A/A genotype may reduce SSRI efficacy, possibly requiring dose escalation or alternative antidepressants. "
+        "[PharmGKB Sertraline](https://www.pharmgkb.org/chemical/PA451333).",
+
+    ("SLC6A4", "S/S", "sertraline"):
+        "S/S genotype of SLC6A4 (5-HTTLPR) is associated with poorer SSRI tolerance and reduced likelihood of response. Consider alternative therapy if ineffective or poorly tolerated. "
+        "[PharmGKB Sertraline](https://www.pharmgkb.org/chemical/PA451333).",
+
+    ("COMT", "Val/Val", "bupropion"):
+        "COMT Val/Val may increase dopamine breakdown, possibly reducing bupropion efficacy in treating depression or ADHD. Clinical significance varies. "
+        "[PharmGKB Bupropion](https://www.pharmgkb.org/chemical/PA448687).",
+    # --- Expanded Tempus Panel Clinical Comments ---
+
+    ("CYP2B6", "Poor Metabolizer", "bupropion"):
+        "CYP2B6 Poor Metabolizer status impairs bupropion clearance, increasing plasma concentrations and risk of adverse effects such as agitation, insomnia, or, rarely, seizures. Dose reduction or alternative therapy may be needed. "
+        "[FDA Label](https://dailymed.nlm.nih.gov/dailymed/drugInfo.cfm?setid=4956af38-182a-4015-a945-67e40bd38772) | [PharmGKB Bupropion](https://www.pharmgkb.org/chemical/PA448687).",
+
+    ("CYP2B6", "Intermediate Metabolizer", "bupropion"):
+        "Intermediate CYP2B6 activity can moderately reduce bupropion clearance, raising exposure and side effect risk. Monitor for adverse reactions and adjust dose if clinically warranted. "
+        "[FDA Label](https://dailymed.nlm.nih.gov/dailymed/drugInfo.cfm?setid=4956af38-182a-4015-a945-67e40bd38772) | [PharmGKB Bupropion](https://www.pharmgkb.org/chemical/PA448687).",
+
+    ("CYP2C9", "Poor Metabolizer", "phenytoin"):
+        "CYP2C9 Poor Metabolizer status leads to significantly reduced phenytoin clearance, increasing toxicity risk (e.g., ataxia, nystagmus, CNS effects). Consider alternative therapy or substantial dose reduction with frequent monitoring. "
+        "[CPIC Phenytoin Guideline](https://cpicpgx.org/guidelines/guideline-for-phenytoin/) | [PharmGKB Phenytoin](https://www.pharmgkb.org/chemical/PA451094).",
+
+    ("CYP2C9", "Poor Metabolizer", "valproate"):
+        "Poor CYP2C9 metabolism can elevate valproate concentrations, increasing risk for hepatotoxicity, thrombocytopenia, and other adverse effects. Dose adjustment and regular monitoring are recommended. "
+        "[FDA Label](https://dailymed.nlm.nih.gov/dailymed/drugInfo.cfm?setid=82d29262-c72b-48d1-8471-5d582b3496ea) | [PharmGKB Valproic Acid](https://www.pharmgkb.org/chemical/PA451846).",
+
+    ("CYP3A5", "Poor Metabolizer", "quetiapine"):
+        "Reduced CYP3A5 activity may contribute to higher quetiapine concentrations, especially in patients with decreased CYP3A4. Monitor for increased sedation and adverse effects. "
+        "[FDA Label](https://dailymed.nlm.nih.gov/dailymed/drugInfo.cfm?setid=0584dda8-bc3c-48fe-1a90-79608f78e8a0) | [PharmGKB Quetiapine](https://www.pharmgkb.org/chemical/PA451201).",
+
+    ("CYP3A5", "Intermediate Metabolizer", "quetiapine"):
+        "Intermediate CYP3A5 activity can result in modestly increased quetiapine exposure. Monitor for sedation and titrate dose if needed. "
+        "[FDA Label](https://dailymed.nlm.nih.gov/dailymed/drugInfo.cfm?setid=0584dda8-bc3c-48fe-1a90-79608f78e8a0) | [PharmGKB Quetiapine](https://www.pharmgkb.org/chemical/PA451201).",
+
+    ("UGT1A4", "Poor Metabolizer", "lamotrigine"):
+        "Poor UGT1A4 metabolism can slow lamotrigine clearance, increasing plasma levels and risk for adverse effects (e.g., dizziness, rash). Consider slower titration and close monitoring. "
+        "[FDA Label](https://dailymed.nlm.nih.gov/dailymed/drugInfo.cfm?setid=0b0f0209-edbd-46f3-9bed-762cbea0d737) | [PharmGKB Lamotrigine](https://www.pharmgkb.org/chemical/PA450164).",
+
+    ("UGT2B15", "Poor Metabolizer", "lorazepam"):
+        "UGT2B15 Poor Metabolizer status reduces lorazepam clearance, increasing risk for prolonged sedation and CNS depression. Consider lower initial dosing and monitor closely, especially in older adults. "
+        "[PMID: 15961980](https://pubmed.ncbi.nlm.nih.gov/15961980/) | [PharmGKB Lorazepam](https://www.pharmgkb.org/chemical/PA450267).",
+
+    ("UGT2B15", "Poor Metabolizer", "oxazepam"):
+        "Reduced UGT2B15 activity impairs oxazepam clearance, raising exposure and risk of sedation. Start with lower doses and monitor response. "
+        "[PMID: 15044558](https://pubmed.ncbi.nlm.nih.gov/15044558/) | [PharmGKB Oxazepam](https://www.pharmgkb.org/chemical/PA450731).",
+
+    ("HLA-A*31:01", "Positive", "carbamazepine"):
+        "HLA-A*31:01 positivity is strongly associated with increased risk of carbamazepine-induced hypersensitivity reactions, including SJS/TEN. Do NOT initiate carbamazepine; choose alternatives. "
+        "[PharmGKB Carbamazepine](https://www.pharmgkb.org/chemical/PA448785).",
+
+    ("HLA-A*31:01", "Positive", "oxcarbazepine"):
+        "Patients positive for HLA-A*31:01 have higher risk for severe cutaneous adverse reactions with oxcarbazepine. Avoid use and select non-aromatic anticonvulsants. "
+        "[PharmGKB Oxcarbazepine](https://www.pharmgkb.org/chemical/PA450083).",
+
+    ("HLA-B*15:02", "Positive", "carbamazepine"):
+        "HLA-B*15:02 is associated with life-threatening SJS/TEN after carbamazepine exposure, especially in patients of Asian ancestry. **Contraindicated**—do not prescribe. "
+        "[PharmGKB Carbamazepine](https://www.pharmgkb.org/chemical/PA448785).",
+
+    ("HLA-B*15:02", "Positive", "oxcarbazepine"):
+        "HLA-B*15:02 carriers are at high risk for Stevens-Johnson Syndrome and toxic epidermal necrolysis with oxcarbazepine. Avoid use—select an alternative agent. "
+        "[PharmGKB Oxcarbazepine](https://www.pharmgkb.org/chemical/PA450083).",
+
+    ("MTHFR", "C/T", "any"):
+        "MTHFR variants may impact folate metabolism, but routine clinical action in psychiatric care is not established. Consider folate supplementation only if deficiency suspected or clinically indicated. "
+        "[PharmGKB MTHFR](https://www.pharmgkb.org/gene/PA162373209).",
+
+    ("MTHFR", "A/C", "any"):
+        "A/C variant in MTHFR may affect folate pathways; direct pharmacogenomic action for psychiatric medication selection is not currently recommended. "
+        "[PharmGKB MTHFR](https://www.pharmgkb.org/gene/PA162373209).",
+}
+PRIOR_RISKS = {
+    "risperidone": 0.1,
+    "aripiprazole": 0.07,
+    "haloperidol": 0.12,
+    "quetiapine": 0.07,
+    "olanzapine": 0.05,
+    "clozapine": 0.04,
+    "citalopram": 0.08,
+    "escitalopram": 0.07,
+    "paroxetine": 0.09,
+    "fluoxetine": 0.06,
+    "sertraline": 0.05,
+    "venlafaxine": 0.09,
+    "duloxetine": 0.06,
+    "lamotrigine": 0.03,
+    "valproate": 0.1,
+    "clobazam": 0.03,
+    "alprazolam": 0.05,
+    "diazepam": 0.04,
+    "zolpidem": 0.03,
+    "bupropion": 0.05,
+    "buspirone": 0.02,
+    "ziprasidone": 0.06,
+    "clonazepam": 0.05,
+    "lorazepam": 0.04,
+}
+# Observed symptoms that double the estimated risk
+HIGH_RISK_SYMPTOMS = frozenset({
+    "tremor", "agitation", "QT prolongation", "toxicity", "orthostatic hypotension"
+})
+
+# ----------------------- Combined CDS Rule Table -----------------------
+# One lookup per (gene, phenotype, med) returns (factor, prompts, comment).
+# Only combinations with a risk factor produce recommendations.
+# Key strings are interned so probes with interned keys compare by identity.
+CDS_RULES = {
+    tuple(map(sys.intern, key)): (factor, FLOWSHEET_PROMPTS.get(key, ()), CLINICAL_COMMENTS.get(key, ""))
+    for key, factor in PGX_FACTORS.items()
+}
+# Same rules grouped by med, so a patient's meds only visit their own rules:
+# med -> [(gene, phenotype, factor, prompts, comment), ...]
+PGX_BY_DRUG = {}
+for (_gene, _phenotype, _med), (_factor, _prompts, _comment) in CDS_RULES.items():
+    PGX_BY_DRUG.setdefault(_med, []).append((_gene, _phenotype, _factor, _prompts, _comment))
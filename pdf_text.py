@@ -0,0 +1,65 @@
+"""
+PDF text extraction for uploaded PGx reports.
+
+Uses PyMuPDF (fitz) when it is installed and falls back to PyPDF2. Large
+documents are split into page ranges and extracted in worker processes;
+the worker lives in this importable module so it can be pickled (Streamlit
+runs the dashboard script as a synthetic __main__).
+"""
+
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# PyMuPDF (fitz) extracts text in native code; PyPDF2 is kept as a fallback
+# and only imported when a PDF is parsed without fitz
+# (newer releases deprecate the "fitz" module name in favour of "pymupdf")
+try:
+    import pymupdf as fitz
+except ImportError:
+    try:
+        import fitz
+    except ImportError:
+        fitz = None
+
+# Below this many pages, starting worker processes costs more than it saves
+PARALLEL_MIN_PAGES = 16
+
+
+def _extract_page_range(data, start, stop):
+    # Each worker opens its own document; fitz documents are not shared across processes
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return "".join(doc[i].get_text("text") for i in range(start, stop))
+
+
+def parse_pdf(file):
+    data = file.read()
+    if fitz is None:
+        from PyPDF2 import PdfReader
+
+        # Parse from an in-memory copy; strict=False skips repair-and-warn checks
+        pdf = PdfReader(io.BytesIO(data), strict=False)
+        chunks = []
+        for page in pdf.pages:
+            page_text = page.extract_text()
+            if page_text:
+                chunks.append(page_text)
+        return "".join(chunks)
+
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        page_count = doc.page_count
+        workers = min(os.cpu_count() or 1, page_count)
+        if page_count < PARALLEL_MIN_PAGES or workers < 2:
+            return "".join(page.get_text("text") for page in doc)
+
+    # Contiguous page ranges, one per worker, joined back in page order
+    step = -(-page_count // workers)
+    starts = range(0, page_count, step)
+    stops = [min(start + step, page_count) for start in starts]
+    # "spawn" rather than the Linux default "fork": forking Streamlit's multi-threaded
+    # server can copy locks held by other sessions' threads and deadlock the worker
+    spawn = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=len(stops), mp_context=spawn) as pool:
+        parts = pool.map(_extract_page_range, [data] * len(stops), starts, stops)
+        return "".join(parts)